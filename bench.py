@@ -0,0 +1,441 @@
+"""Benchmarks for database.py and the GUI refresh paths.
+
+    python bench.py --sales 100000 --output bench.json
+    python bench.py --sales 100000 --baseline bench.json
+
+A seeded generator fills a scratch database with fragrances, customers,
+sales, supplies and oils, then every case is timed --repeat times and the
+results are written as JSON. With --baseline the run is compared against
+an earlier JSON file and the exit status is 1 if any case got slower by
+more than --threshold.
+
+GUI cases (populate_*, refresh_all_tables, search, record sale) drive the
+real FragranceManagerApp methods against stub widgets, so no display is
+needed; they are skipped if main.py cannot be imported (e.g. no Pillow).
+"""
+import argparse
+import inspect
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import types
+from contextlib import closing
+from datetime import datetime, timedelta
+
+import database
+import reports
+import repository
+
+DEFAULT_SALES = 10000
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 1.2
+GENDERS = ("Men", "Women", "Unisex")
+WORDS = ("amber", "oud", "vanilla", "citrus", "musk", "rose", "cedar", "leather", "iris",
+         "vetiver", "tobacco", "neroli", "saffron", "patchouli", "jasmine", "bergamot")
+HISTORY_DAYS = 3 * 365
+
+# database.py functions that are setup or plumbing rather than something
+# worth timing; everything else public must have a case.
+NOT_BENCHMARKED = {"get_conn", "release_conn", "shutdown", "checkpoint", "storage_profile",
+                   "set_storage_profile", "set_db_path", "connection_open_count", "transaction",
+                   "init_db", "schema_version", "sale_key", "to_cents", "format_cents",
+                   "to_quantity", "to_size", "set_connection_hook", "write_version",
+                   "data_version", "customer_key", "customer_revenue_key"}
+
+# ---------------- DATA ----------------
+def scale_counts(sales):
+    """Row counts per table for a given number of sales."""
+    return {
+        "fragrances": max(100, min(20000, sales // 50)),
+        "customers": max(50, min(100000, sales // 10)),
+        "sales": sales,
+        "supplies": 200,
+        "oils": 200,
+    }
+
+def generate(sales, seed):
+    """Fill the current (empty) database with seeded synthetic data."""
+    rng = random.Random(seed)
+    counts = scale_counts(sales)
+    words = lambda n: " ".join(rng.choice(WORDS) for _ in range(n))
+
+    fragrances = []
+    for i in range(counts["fragrances"]):
+        cost = rng.randint(200, 3000)
+        fragrances.append((f"Fragrance {i:06d} {words(1)}", words(8), GENDERS[i % 3], "Eau de Parfum",
+                           cost, cost + rng.randint(500, 5000), f"{words(2)} {i}", rng.randint(0, 200), ""))
+    customers = [(f"Customer {i:06d}", f"customer{i}@example.com", f"555-{i:07d}", f"City {i % 300}", "")
+                 for i in range(counts["customers"])]
+    with database.transaction() as conn:
+        conn.executemany("""
+            INSERT INTO fragrances (name, description, gender, category, unit_cost, sale_price,
+                                    inspired_by, quantity, image)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, fragrances)
+        conn.executemany("INSERT INTO customers (name, email, phone, city, reference) VALUES (?, ?, ?, ?, ?)",
+                         customers)
+        conn.executemany("INSERT INTO supplies (name, price, purchase_link, quantity) VALUES (?, ?, ?, ?)",
+                         [(f"Supply {i}", rng.randint(10, 5000), "https://example.com", rng.randint(0, 500))
+                          for i in range(counts["supplies"])])
+        conn.executemany("INSERT INTO oils (name, size, price, purchase_link, quantity) VALUES (?, ?, ?, ?, ?)",
+                         [(f"Oil {i}", rng.choice((5, 10, 15, 30)), rng.randint(100, 5000),
+                           "https://example.com", rng.randint(0, 100)) for i in range(counts["oils"])])
+
+    # Sales in date order, as they would have been recorded
+    start = datetime.now() - timedelta(days=HISTORY_DAYS)
+    step = HISTORY_DAYS * 86400 / max(1, sales)
+    batch = []
+    for i in range(sales):
+        f = rng.randrange(len(fragrances))
+        qty = rng.randint(1, 3)
+        cost, price = fragrances[f][4], fragrances[f][5]
+        date = (start + timedelta(seconds=i * step)).strftime("%Y-%m-%d %H:%M:%S")
+        batch.append((f + 1, rng.randint(1, len(customers)), qty, cost, price, price * qty,
+                      (price - cost) * qty, date))
+        if len(batch) == database.BULK_CHUNK_SIZE or i == sales - 1:
+            with database.transaction() as conn:
+                conn.executemany("""
+                    INSERT INTO sales (fragrance_id, customer_id, qty_sold, unit_cost, sale_price,
+                                       revenue, profit, date)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, batch)
+            batch = []
+    with database.get_conn() as conn:
+        conn.execute("ANALYZE")
+    return counts
+
+# ---------------- TIMING ----------------
+def time_case(fn, setup, repeat):
+    timings = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        started = time.perf_counter()
+        result = fn(*args)
+        if inspect.isgenerator(result):
+            for _ in result:
+                pass
+        timings.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(timings), 3), "min_ms": round(min(timings), 3),
+            "max_ms": round(max(timings), 3), "runs": repeat}
+
+def database_cases(counts, rng):
+    """(name, fn, setup) for every database.py (and reports.py) entry point."""
+    nf, nc, ns = counts["fragrances"], counts["customers"], counts["sales"]
+    fid = lambda: rng.randint(1, nf)
+    cid = lambda: rng.randint(1, nc)
+    with closing(database.iter_sales()) as rows:
+        middle = next(itertools.islice(rows, ns // 2, None), None)
+    after = database.sale_key(middle) if middle else None
+    counter = iter(range(10 ** 9))
+    fragrance = lambda: (f"Bench {next(counter)}", "d", "Men", "c", "10.00", "25.00", "x", 50, "")
+    new_fragrance = lambda: (database.insert_fragrance(fragrance()),)
+    new_customer = lambda: (database.insert_customer(("Bench", "", "", "", "")),)
+    new_supply = lambda: (database.insert_supply((f"Bench {next(counter)}", "1", "", 1)),)
+    new_oil = lambda: (database.insert_oil((f"Bench {next(counter)}", 5, "1", "", 1)),)
+    now = lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def restocked(n):
+        ids = [fid() for _ in range(n)]
+        for i in ids:
+            database.update_fragrance_quantity(i, 1000)
+        return ids
+
+    def clear_rollups():
+        with database.transaction() as conn:
+            conn.execute("DELETE FROM sales_rollup_cache")
+            conn.execute("DELETE FROM sales_rollup_periods")
+        return ()
+    return [
+        ("table_version", lambda: database.table_version("fragrances", "sales"), None),
+        ("insert_fragrance", lambda: database.insert_fragrance(fragrance()), None),
+        ("get_all_fragrances", database.get_all_fragrances, None),
+        ("get_all_fragrances_by_gender", lambda: database.get_all_fragrances_by_gender("Men"), None),
+        ("count_fragrances_by_gender", lambda: database.count_fragrances_by_gender("Men"), None),
+        ("get_fragrances_page", lambda: database.get_fragrances_page("Men", 0, 30), None),
+        ("get_fragrances_page.deep", lambda: database.get_fragrances_page("Men", nf // 4, 30), None),
+        ("search_fragrances.fts", lambda: database.search_fragrances("vanilla"), None),
+        ("search_fragrances.short", lambda: database.search_fragrances("ou"), None),
+        ("get_fragrance_by_id", lambda: database.get_fragrance_by_id(fid()), None),
+        ("get_fragrance_by_name", lambda: database.get_fragrance_by_name(f"Fragrance {nf // 2:06d}"), None),
+        ("update_fragrance", lambda i: database.update_fragrance(i, fragrance()), new_fragrance),
+        ("update_fragrance_quantity", lambda: database.update_fragrance_quantity(fid(), 100), None),
+        ("delete_fragrance", database.delete_fragrance, new_fragrance),
+        ("get_unimported_images", database.get_unimported_images, None),
+        ("set_imported_image", lambda: database.set_imported_image(fid(), "missing.png", "missing.png", "0" * 64), None),
+        ("get_inventory_summary", database.get_inventory_summary, None),
+        ("get_inventory_totals", database.get_inventory_totals, None),
+        ("get_low_stock_fragrances", database.get_low_stock_fragrances, None),
+        ("insert_customer", lambda: database.insert_customer(("Bench", "b@x", "1", "c", "")), None),
+        ("get_all_customers", database.get_all_customers, None),
+        ("search_customers", lambda: database.search_customers(f"Customer {rng.randint(0, nc - 1) // 100:04d}"), None),
+        ("search_customers.dense", lambda: database.search_customers("c"), None),
+        ("search_customers.stats", lambda: database.search_customers(with_stats=True), None),
+        ("search_customers.revenue", lambda: database.search_customers(sort="revenue"), None),
+        ("search_customers.segment", lambda: database.search_customers(segment="one-time"), None),
+        ("get_customer_stats", lambda: database.get_customer_stats(cid()), None),
+        ("get_customer_by_id", lambda: database.get_customer_by_id(cid()), None),
+        ("update_customer", lambda: database.update_customer(cid(), ("Bench", "b@x", "1", "c", "")), None),
+        ("delete_customer", database.delete_customer, new_customer),
+        ("record_sale", lambda f: database.record_sale(f, cid(), 1, now()), lambda: restocked(1)),
+        ("record_basket_sale", lambda *ids: database.record_basket_sale(cid(), [(i, 1) for i in ids], now()),
+         lambda: restocked(5)),
+        ("insert_sale", lambda: database.insert_sale((fid(), cid(), 1, "10", "25", "25", "15", now())), None),
+        ("iter_sales.page", lambda: list(database.iter_sales(limit=200)), None),
+        ("iter_sales.filtered", lambda: list(database.iter_sales(customer_id=cid(), limit=200)), None),
+        ("get_sales_after", lambda: database.get_sales_after(after, 200), None),
+        ("iter_sales.all", database.iter_sales, None),
+        ("insert_supply", lambda: database.insert_supply((f"Bench {next(counter)}", "1", "", 1)), None),
+        ("get_all_supplies", database.get_all_supplies, None),
+        ("get_supply_by_id", lambda: database.get_supply_by_id(1), None),
+        ("get_supply_by_name", lambda: database.get_supply_by_name("Supply 1"), None),
+        ("update_supply", lambda: database.update_supply(1, ("Supply 0", "2", "", 5)), None),
+        ("delete_supply", database.delete_supply, new_supply),
+        ("insert_oil", lambda: database.insert_oil((f"Bench {next(counter)}", 5, "1", "", 1)), None),
+        ("get_all_oils", database.get_all_oils, None),
+        ("get_oil_by_id", lambda: database.get_oil_by_id(1), None),
+        ("get_oil_by_name", lambda: database.get_oil_by_name("Oil 1"), None),
+        ("update_oil", lambda: database.update_oil(1, ("Oil 0", 5, "2", "", 5)), None),
+        ("delete_oil", database.delete_oil, new_oil),
+        ("insert_missing", lambda: database.insert_missing("supplies", [("Supply 1", 1, "", 1), ("Supply 2", 1, "", 1)]), None),
+        ("export_rows.sales", lambda: database.export_rows("sales"), None),
+        ("import_records.supplies_1k", lambda: database.import_records(
+            "supplies", ({"name": f"Imported {i}", "price": "1.50", "quantity": i} for i in range(1000))), None),
+        ("sales_report.month.cold", lambda: reports.sales_report("month"), clear_rollups),
+        ("sales_report.month.warm", lambda: reports.sales_report("month"), None),
+        ("sales_report.day.fragrance.warm", lambda: reports.sales_report("day", "fragrance"), None),
+    ]
+
+# ---------------- GUI STUBS ----------------
+# Just enough of Tk for the app's table code: widgets accept and ignore
+# everything, while the Treeview stub keeps real rows so VirtualTable's
+# diffing does its normal work.
+def _ignore(*args, **kwargs):
+    return None
+
+class StubWidget:
+    def __init__(self, *args, **kwargs):
+        self._options = dict(kwargs)
+
+    def __getattr__(self, name):
+        return _ignore
+
+    def cget(self, key):
+        return self._options.get(key, "")
+
+class StubTree(StubWidget):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._order = []
+        self._items = {}
+        self._selection = ()
+
+    def get_children(self, item=""):
+        return tuple(self._order)
+
+    def insert(self, parent, index, iid=None, **kw):
+        self._order.insert(index if index != "end" else len(self._order), iid)
+        self._items[iid] = kw
+        return iid
+
+    def item(self, iid, **kw):
+        self._items[iid].update(kw)
+
+    def delete(self, *iids):
+        for iid in iids:
+            self._order.remove(iid)
+            del self._items[iid]
+
+    def move(self, iid, parent, index):
+        self._order.remove(iid)
+        self._order.insert(index, iid)
+
+    def exists(self, iid):
+        return iid in self._items
+
+    def selection(self):
+        return self._selection
+
+    def selection_set(self, *items):
+        self._selection = tuple(i for item in items for i in (item if isinstance(item, tuple) else (item,)))
+
+    def bbox(self, iid):
+        return ()
+
+class StubRoot(StubWidget):
+    def after(self, ms, fn=None, *args):
+        return "after#0"
+
+def headless_app():
+    """A FragranceManagerApp with every tab built against stub widgets."""
+    import main
+
+    fake_ttk = types.SimpleNamespace(Frame=StubWidget, Label=StubWidget, Button=StubWidget, Entry=StubWidget,
+                                     Scrollbar=StubWidget, Checkbutton=StubWidget, Combobox=StubWidget,
+                                     LabelFrame=StubWidget, Style=StubWidget, Treeview=StubTree)
+    fake_tk = types.SimpleNamespace(BooleanVar=StubWidget, StringVar=StubWidget, Toplevel=StubWidget,
+                                    Menu=StubWidget, LEFT="left")
+    main.ttk, main.tk = fake_ttk, fake_tk
+    app = main.FragranceManagerApp.__new__(main.FragranceManagerApp)
+    app._init_state(StubRoot())
+    app.image_cache = app.thumb_cache = types.SimpleNamespace(get=_ignore, request=_ignore, prefetch=_ignore)
+    app.live_search = types.SimpleNamespace(query=None)
+    app.dashboard_label = app.image_viewer_frame = app.image_label = app.detail_text_label = StubWidget()
+    for gender in GENDERS:
+        app.setup_fragrance_tab(StubWidget(), gender)
+    app.setup_customer_tab(StubWidget())
+    app.setup_sales_tab(StubWidget())
+    app.setup_supplies_tab(StubWidget())
+    app.setup_oils_tab(StubWidget())
+    return app
+
+def gui_cases(counts, rng):
+    app = headless_app()
+    nf, nc = counts["fragrances"], counts["customers"]
+    fid = lambda: rng.randint(1, nf)
+
+    def stale(*trees):
+        # Forget what was rendered, so the next refresh re-reads its table
+        def setup():
+            for tree in trees:
+                app.tables[getattr(app, tree)].rendered_version = None
+            return ()
+        return setup
+
+    def restock():
+        app.selected_id = fid()
+        repository.update_fragrance_quantity(app.selected_id, 1000)
+        return ()
+
+    def select_customer():
+        app.selected_customer_id = rng.randint(1, nc)
+        return ()
+
+    def gui_record_sale():
+        # what the Record Sale dialog runs: the write, then its on_done
+        repository.record_sale(app.selected_id, rng.randint(1, nc), 1, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        app.refresh_all_tables()
+        app.update_fragrance_viewer(app.selected_id)
+
+    return [
+        ("gui.populate_table", lambda: app.populate_table(app.men_tree, "Men"), stale("men_tree")),
+        ("gui.populate_customers", app.populate_customers, stale("customer_tree")),
+        ("gui.populate_customer_history", app.populate_customer_history, select_customer),
+        ("gui.populate_sales", app.populate_sales, stale("sales_tree")),
+        ("gui.populate_supplies", app.populate_supplies, stale("supplies_tree")),
+        ("gui.populate_oils", app.populate_oils, stale("oils_tree")),
+        ("gui.refresh_all_tables.unchanged", app.refresh_all_tables, None),
+        ("gui.refresh_all_tables.changed", app.refresh_all_tables,
+         stale("men_tree", "women_tree", "unisex_tree", "customer_tree", "sales_tree", "supplies_tree", "oils_tree")),
+        ("gui.search_fragrance", lambda: app.show_search_results(database.search_fragrances("vanilla")), None),
+        ("gui.update_fragrance_viewer", lambda: app.update_fragrance_viewer(fid()), None),
+        ("gui.record_sale", gui_record_sale, restock),
+    ]
+
+# ---------------- REPORT ----------------
+def compare(results, baseline, threshold):
+    """Print a comparison table; returns the names that regressed."""
+    regressed = []
+    print(f"{'case':40} {'baseline':>11} {'now':>11} {'ratio':>7}")
+    for name, result in results.items():
+        old = baseline.get(name)
+        if not old:
+            print(f"{name:40} {'-':>11} {result['median_ms']:>9.3f}ms {'new':>7}")
+            continue
+        ratio = result["median_ms"] / old["median_ms"] if old["median_ms"] else float("inf")
+        flag = " <-- slower" if ratio > threshold else ""
+        if ratio > threshold:
+            regressed.append(name)
+        print(f"{name:40} {old['median_ms']:>9.3f}ms {result['median_ms']:>9.3f}ms {ratio:>6.2f}x{flag}")
+    return regressed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark database.py and the GUI refresh paths")
+    parser.add_argument("--sales", type=int, default=DEFAULT_SALES, help="number of sales to generate (1k to 1M)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--db", help="database file to build (default: a temporary file)")
+    parser.add_argument("--profile", choices=("fast", "durable"), help="SQLite storage profile")
+    parser.add_argument("--only", help="run only cases whose name contains this text")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="compare against this earlier results JSON")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown ratio counted as a regression (default 1.2)")
+    args = parser.parse_args(argv)
+
+    workdir = None
+    path = args.db
+    if path is None:
+        workdir = tempfile.TemporaryDirectory(prefix="ljfm-bench-")
+        path = os.path.join(workdir.name, "bench.db")
+    elif os.path.exists(path):
+        parser.error(f"{path} already exists; benchmarks need a fresh database")
+    database.set_db_path(path)
+    if args.profile:
+        database.set_storage_profile(args.profile)
+    database.init_db()
+
+    started = time.perf_counter()
+    counts = generate(args.sales, args.seed)
+    generate_s = time.perf_counter() - started
+    print(f"Generated {counts} in {generate_s:.1f}s", file=sys.stderr)
+
+    rng = random.Random(args.seed)
+    cases = database_cases(counts, rng)
+    covered = {name.split(".")[0] for name, _, _ in cases}
+    public = {name for name, obj in vars(database).items()
+              if inspect.isfunction(obj) and obj.__module__ == "database" and not name.startswith("_")}
+    missing = sorted(public - covered - NOT_BENCHMARKED)
+    if missing:
+        print(f"Not benchmarked: {', '.join(missing)}", file=sys.stderr)
+    try:
+        cases += gui_cases(counts, rng)
+    except ImportError as e:
+        print(f"Skipping GUI cases: {e}", file=sys.stderr)
+
+    results = {}
+    for name, fn, setup in cases:
+        if args.only and args.only not in name:
+            continue
+        results[name] = time_case(fn, setup, args.repeat)
+        print(f"{name:40} {results[name]['median_ms']:>10.3f} ms", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "sales": args.sales, "seed": args.seed, "repeat": args.repeat, "counts": counts,
+            "generate_s": round(generate_s, 2), "profile": database.STORAGE_PROFILE,
+            "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(), "timestamp": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+    database.shutdown()
+    if workdir:
+        workdir.cleanup()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        if baseline["meta"].get("sales") != args.sales:
+            print(f"Warning: baseline was run with {baseline['meta'].get('sales')} sales", file=sys.stderr)
+        regressed = compare(results, baseline["results"], args.threshold)
+        if regressed:
+            print(f"{len(regressed)} case(s) slower than {args.threshold}x baseline", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+import csv
+import json
+import os
+from contextlib import contextmanager, nullcontext
+
+from database import BULK_CHUNK_SIZE, BULK_COLUMNS, export_rows, import_records
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".json": "jsonl"}
+PROGRESS_EVERY = 5000
+TABLES = tuple(BULK_COLUMNS)
+
+# ---------------- FILES ----------------
+# Exports and imports stream one row at a time: CSV with a header row, or
+# JSON Lines with one object per row. Either way memory use does not grow
+# with the size of the file.
+def detect_format(path):
+    fmt = FORMATS.get(os.path.splitext(str(path))[1].lower())
+    if fmt is None:
+        raise ValueError(f"Cannot tell the format of {path!r}; use .csv or .jsonl")
+    return fmt
+
+@contextmanager
+def _open_for_write(target):
+    """Open target for writing; paths are written to a temporary file first."""
+    if not isinstance(target, (str, os.PathLike)):
+        yield target
+        return
+    tmp = f"{target}.tmp"
+    try:
+        with open(tmp, "w", newline="", encoding="utf-8") as fh:
+            yield fh
+        os.replace(tmp, target)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def _open_for_read(source):
+    if not isinstance(source, (str, os.PathLike)):
+        return nullcontext(source)
+    # utf-8-sig drops the BOM spreadsheet programs put in CSV exports
+    return open(source, newline="", encoding="utf-8-sig")
+
+# ---------------- EXPORT ----------------
+def export_table(table, target, fmt=None, progress=None):
+    """Write every row of table to target (a path or open text file).
+
+    fmt is "csv" or "jsonl", taken from the file extension when omitted.
+    progress(count) is called every PROGRESS_EVERY rows and at the end.
+    Returns the number of rows written.
+    """
+    fmt = fmt or detect_format(target)
+    columns = BULK_COLUMNS[table]
+    count = 0
+    with _open_for_write(target) as fh:
+        if fmt == "csv":
+            writer = csv.writer(fh)
+            writer.writerow(columns)
+            write = writer.writerow
+        else:
+            write = lambda row: fh.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n")
+        for row in export_rows(table):
+            write(row)
+            count += 1
+            if progress and count % PROGRESS_EVERY == 0:
+                progress(count)
+    if progress:
+        progress(count)
+    return count
+
+# ---------------- IMPORT ----------------
+def read_records(source, fmt=None):
+    """Yield one dict of column -> value per row of source."""
+    fmt = fmt or detect_format(source)
+    with _open_for_read(source) as fh:
+        if fmt == "csv":
+            yield from csv.DictReader(fh)
+            return
+        for number, line in enumerate(fh, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {number}: {e}") from None
+
+def import_table(table, source, fmt=None, chunk_size=BULK_CHUNK_SIZE, progress=None):
+    """Upsert the rows of source into table; see database.import_records()."""
+    return import_records(table, read_records(source, fmt), chunk_size, progress)
@@ -1,93 +1,785 @@
+import atexit
+import itertools
+import os
 import sqlite3
-from contextlib import closing
+import threading
+from contextlib import closing, contextmanager
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 
 DB_NAME = "fragrances.db"
+STATEMENT_CACHE_SIZE = 256
+LOW_STOCK_THRESHOLD = 5
+
+# ---------------- STORAGE PROFILES ----------------
+# Per-connection pragmas, applied when the pool opens a connection.
+# "durable" keeps SQLite's defaults: rollback journal and an fsync on every
+# commit. "fast" uses WAL, so readers never block the writer, and
+# synchronous=NORMAL, which only fsyncs at checkpoints (a power cut can
+# lose the last few commits but cannot corrupt the file), plus a larger
+# page cache, memory-mapped reads and in-memory temp tables.
+STORAGE_PROFILES = {
+    "durable": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+    },
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -32000,          # KiB, i.e. 32 MB
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 1000,    # pages
+    },
+}
+STORAGE_PROFILE = os.environ.get("LJFM_STORAGE_PROFILE", "fast")
 
 # ---------------- CONNECTION ----------------
+class ConnectionPool:
+    """Thread-aware pool of long-lived SQLite connections.
+
+    Each thread borrows one connection on first use and keeps it until it
+    calls release(), so every query on that thread reuses the same handle and
+    its prepared statement cache. Released connections go back to an idle
+    list for the next thread instead of being reopened.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []
+        self._idle = []
+        self.opened = 0
+        self.on_open = None
+
+    def _open(self):
+        conn = sqlite3.connect(DB_NAME, cached_statements=STATEMENT_CACHE_SIZE,
+                               check_same_thread=False)
+        conn.execute("PRAGMA foreign_keys = ON")
+        for pragma, value in storage_profile().items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        with self._lock:
+            self._all.append(conn)
+            self.opened += 1
+        if self.on_open:
+            self.on_open(conn, True)
+        return conn
+
+    def acquire(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = self._open()
+            self._local.conn = conn
+        return conn
+
+    def release(self):
+        """Return the calling thread's connection to the idle list."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            self._idle.append(conn)
+
+    def is_open(self):
+        return bool(self._all)
+
+    def close_all(self):
+        """Close every connection the pool has handed out."""
+        with self._lock:
+            conns, self._all, self._idle = self._all, [], []
+            self._local = threading.local()
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+
+_pool = ConnectionPool()
+
+
 def get_conn():
-    conn = sqlite3.connect(DB_NAME)
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+    """Return the calling thread's pooled connection.
+
+    Used as ``with get_conn() as conn:`` the block commits on success and
+    rolls back on error; the connection itself stays open for reuse.
+    """
+    return _pool.acquire()
+
+def release_conn():
+    _pool.release()
+
+def shutdown():
+    """Checkpoint the WAL into the database file and close every connection."""
+    if _pool.is_open():
+        try:
+            checkpoint("TRUNCATE")
+            with get_conn() as conn:
+                conn.execute("PRAGMA optimize")
+        except sqlite3.Error as e:
+            print(f"Error during database shutdown: {e}")
+    _pool.close_all()
+
+def checkpoint(mode="PASSIVE"):
+    """Copy WAL content back into the database file (no-op outside WAL mode).
+
+    PASSIVE never waits on readers or writers; TRUNCATE, used at shutdown,
+    also empties the -wal file.
+    """
+    with get_conn() as conn:
+        return conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+
+def storage_profile():
+    try:
+        return STORAGE_PROFILES[STORAGE_PROFILE]
+    except KeyError:
+        raise ValueError(f"Unknown storage profile {STORAGE_PROFILE!r}; "
+                         f"choose one of {', '.join(STORAGE_PROFILES)}") from None
+
+def set_storage_profile(name):
+    """Switch profile; connections opened from now on use it."""
+    global STORAGE_PROFILE
+    if name not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile {name!r}; choose one of {', '.join(STORAGE_PROFILES)}")
+    shutdown()
+    STORAGE_PROFILE = name
+
+def set_db_path(path):
+    """Point the pool at another database file, closing current handles."""
+    global DB_NAME, _fts_available
+    shutdown()
+    DB_NAME = path
+    _fts_available = None
+
+def connection_open_count():
+    """Number of sqlite3 connections opened since startup."""
+    return _pool.opened
+
+def set_connection_hook(hook):
+    """Call hook(conn, new) for every pooled connection; None removes it.
+
+    Connections already open are passed at once with new=False, and each
+    one opened later with new=True (see instrument.py).
+    """
+    _pool.on_open = hook
+    if hook:
+        with _pool._lock:
+            conns = list(_pool._all)
+        for conn in conns:
+            hook(conn, False)
+
+atexit.register(shutdown)
+
+@contextmanager
+def transaction():
+    """Run a block in one BEGIN IMMEDIATE transaction on the pooled connection.
+
+    The write lock is taken up front, so checks made inside the block still
+    hold when it commits, even with other processes writing.
+    """
+    conn = get_conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+# ---------------- CHANGE TRACKING ----------------
+_version_counter = itertools.count(1)
+_table_versions = {"fragrances": 0, "customers": 0, "sales": 0, "supplies": 0, "oils": 0}
+
+def _touch(*tables):
+    for table in tables:
+        _table_versions[table] = next(_version_counter)
+
+def table_version(*tables):
+    """Change token for the given tables.
+
+    It changes whenever one of the tables is written through this module, or
+    when another connection commits (PRAGMA data_version), so callers can
+    skip re-reading data that has not changed.
+    """
+    return write_version(*tables) + (data_version(),)
+
+def write_version(*tables):
+    """The in-process part of table_version(); needs no query."""
+    return tuple(_table_versions[t] for t in tables)
+
+def data_version():
+    """PRAGMA data_version of this thread's connection.
+
+    It changes when any other connection, in this process or another one,
+    commits to the database.
+    """
+    with get_conn() as conn:
+        return conn.execute("PRAGMA data_version").fetchone()[0]
+
+# ---------------- MONEY ----------------
+# Prices are stored as integer cents. Insert/update functions take amounts
+# in currency units (strings from the forms, or numbers) and convert them
+# here, so bad input is rejected before it reaches the database.
+def to_cents(value, field="Amount", signed=False):
+    try:
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"{field} must be a number") from None
+    if not amount.is_finite():
+        raise ValueError(f"{field} must be a number")
+    if amount < 0 and not signed:
+        raise ValueError(f"{field} must be zero or more")
+    return int((amount * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def format_cents(cents):
+    """Integer cents as a plain decimal string, e.g. 1250 -> "12.50"."""
+    sign = "-" if cents < 0 else ""
+    whole, frac = divmod(abs(cents), 100)
+    return f"{sign}{whole}.{frac:02d}"
+
+def to_quantity(value, field="Quantity"):
+    try:
+        quantity = int(str(value).strip())
+    except ValueError:
+        raise ValueError(f"{field} must be a whole number") from None
+    if quantity < 0:
+        raise ValueError(f"{field} must be zero or more")
+    return quantity
+
+def to_size(value, field="Size"):
+    try:
+        size = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a number") from None
+    if not size >= 0:
+        raise ValueError(f"{field} must be zero or more")
+    return size
 
 # ---------------- SETUP ----------------
 def init_db():
+    """Create the database, or upgrade an existing one in place.
+
+    PRAGMA user_version records how many MIGRATIONS have been applied; each
+    pending migration runs in its own transaction and bumps the version.
+    Importing this module does not touch the database; callers run this
+    once at startup.
+
+    Returns the notes the upgrade left about data it had to change or set
+    aside (also kept in the upgrade_log table), for the caller to show.
+    """
+    global _fts_available
+    _upgrade_notes.clear()
     with get_conn() as conn:
-        c = conn.cursor()
-        # Fragrances
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS fragrances (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE,
-                description TEXT,
-                gender TEXT,
-                category TEXT,
-                unit_cost REAL,
-                sale_price REAL,
-                inspired_by TEXT,
-                quantity INTEGER,
-                image TEXT
-            )
-        """)
-        # Customers
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS customers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT,
-                email TEXT,
-                phone TEXT,
-                city TEXT,
-                reference TEXT
-            )
-        """)
-        # Sales
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS sales (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                fragrance_id INTEGER,
-                customer_id INTEGER,
-                qty_sold INTEGER,
-                unit_cost REAL,
-                sale_price REAL,
-                revenue REAL,
-                profit REAL,
-                date TEXT,
-                FOREIGN KEY(fragrance_id) REFERENCES fragrances(id) ON DELETE CASCADE,
-                FOREIGN KEY(customer_id) REFERENCES customers(id) ON DELETE CASCADE
-            )
-        """)
-        # Supplies
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS supplies (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE,
-                price REAL,
-                purchase_link TEXT,
-                quantity INTEGER
-            )
-        """)
-        # Oils
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS oils (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE,
-                size REAL,
-                price REAL,
-                purchase_link TEXT,
-                quantity INTEGER
-            )
-        """)
-        conn.commit()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version < len(MIGRATIONS):
+        # Table rebuilds drop the old table; with foreign keys on that would
+        # cascade-delete every sale. The pragma is a no-op inside a
+        # transaction, so it is switched around the whole run.
+        conn.execute("PRAGMA foreign_keys = OFF")
+        try:
+            for number, migrate in enumerate(MIGRATIONS[version:], start=version + 1):
+                with transaction() as conn:
+                    migrate(conn.cursor())
+                    conn.execute(f"PRAGMA user_version = {number}")
+        finally:
+            conn.execute("PRAGMA foreign_keys = ON")
+    _fts_available = None
+    return list(_upgrade_notes)
+
+def schema_version():
+    with get_conn() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+# ---------------- MIGRATIONS ----------------
+# Schema changes are appended to MIGRATIONS and never edited once shipped.
+# The early steps are idempotent because databases created before
+# versioning (user_version 0) may already have some of them applied.
+def _create_tables(c):
+    # Fragrances
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS fragrances (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE,
+            description TEXT,
+            gender TEXT,
+            category TEXT,
+            unit_cost REAL,
+            sale_price REAL,
+            inspired_by TEXT,
+            quantity INTEGER,
+            image TEXT
+        )
+    """)
+    # Customers
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS customers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            email TEXT,
+            phone TEXT,
+            city TEXT,
+            reference TEXT
+        )
+    """)
+    # Sales
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS sales (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fragrance_id INTEGER,
+            customer_id INTEGER,
+            qty_sold INTEGER,
+            unit_cost REAL,
+            sale_price REAL,
+            revenue REAL,
+            profit REAL,
+            date TEXT,
+            FOREIGN KEY(fragrance_id) REFERENCES fragrances(id) ON DELETE CASCADE,
+            FOREIGN KEY(customer_id) REFERENCES customers(id) ON DELETE CASCADE
+        )
+    """)
+    # Supplies
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS supplies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE,
+            price REAL,
+            purchase_link TEXT,
+            quantity INTEGER
+        )
+    """)
+    # Oils
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS oils (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE,
+            size REAL,
+            price REAL,
+            purchase_link TEXT,
+            quantity INTEGER
+        )
+    """)
+
+def _add_image_hash(c):
+    # Images already on disk are copied into the store after startup, one
+    # writer job each (see FragranceManagerApp.import_legacy_images()).
+    _ensure_column(c, "fragrances", "image_hash", "TEXT")
+
+def _ensure_column(c, table, column, decl):
+    c.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in c.fetchall()]:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+# Fragrance search uses an external-content FTS5 table with the trigram
+# tokenizer, so substring queries of 3+ characters are index lookups.
+# Triggers keep it in step with the fragrances table.
+FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS fragrances_fts_ai AFTER INSERT ON fragrances BEGIN
+        INSERT INTO fragrances_fts(rowid, name, inspired_by, description)
+        VALUES (new.id, new.name, new.inspired_by, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS fragrances_fts_ad AFTER DELETE ON fragrances BEGIN
+        INSERT INTO fragrances_fts(fragrances_fts, rowid, name, inspired_by, description)
+        VALUES ('delete', old.id, old.name, old.inspired_by, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS fragrances_fts_au AFTER UPDATE OF name, inspired_by, description ON fragrances BEGIN
+        INSERT INTO fragrances_fts(fragrances_fts, rowid, name, inspired_by, description)
+        VALUES ('delete', old.id, old.name, old.inspired_by, old.description);
+        INSERT INTO fragrances_fts(rowid, name, inspired_by, description)
+        VALUES (new.id, new.name, new.inspired_by, new.description);
+    END""",
+]
+
+def _create_fragrance_search(c):
+    c.execute("SELECT 1 FROM sqlite_master WHERE name='fragrances_fts'")
+    if not c.fetchone():
+        try:
+            c.execute("""
+                CREATE VIRTUAL TABLE fragrances_fts USING fts5(
+                    name, inspired_by, description,
+                    content='fragrances', content_rowid='id', tokenize='trigram'
+                )
+            """)
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5 or older than 3.34 (no trigram):
+            # search falls back to LIKE.
+            return
+        c.execute("INSERT INTO fragrances_fts(fragrances_fts) VALUES ('rebuild')")
+    for trigger in FTS_TRIGGERS:
+        c.execute(trigger)
+
+def _create_indexes(c):
+    # Per-gender tab loads, the sales joins / ON DELETE CASCADE lookups and
+    # date-ordered sales queries.
+    c.execute("CREATE INDEX IF NOT EXISTS idx_fragrances_gender ON fragrances(gender)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sales_fragrance ON sales(fragrance_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sales_customer ON sales(customer_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sales_date ON sales(date)")
+
+# Money columns hold integer cents; typeof() checks stop REAL or TEXT
+# values sneaking in through INTEGER affinity.
+MONEY_SCHEMA = {
+    "fragrances": ("""
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE,
+            description TEXT,
+            gender TEXT,
+            category TEXT,
+            unit_cost INTEGER NOT NULL DEFAULT 0 CHECK (typeof(unit_cost) = 'integer' AND unit_cost >= 0),
+            sale_price INTEGER NOT NULL DEFAULT 0 CHECK (typeof(sale_price) = 'integer' AND sale_price >= 0),
+            inspired_by TEXT,
+            quantity INTEGER NOT NULL DEFAULT 0 CHECK (typeof(quantity) = 'integer' AND quantity >= 0),
+            image TEXT,
+            image_hash TEXT
+        )
+    """, """
+        id, name, description, gender, category,
+        MAX(0, CAST(ROUND(COALESCE(unit_cost, 0) * 100) AS INTEGER)),
+        MAX(0, CAST(ROUND(COALESCE(sale_price, 0) * 100) AS INTEGER)),
+        inspired_by, MAX(0, CAST(COALESCE(quantity, 0) AS INTEGER)), image, image_hash
+    """),
+    "sales": ("""
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fragrance_id INTEGER,
+            customer_id INTEGER,
+            qty_sold INTEGER NOT NULL CHECK (typeof(qty_sold) = 'integer' AND qty_sold > 0),
+            unit_cost INTEGER NOT NULL CHECK (typeof(unit_cost) = 'integer' AND unit_cost >= 0),
+            sale_price INTEGER NOT NULL CHECK (typeof(sale_price) = 'integer' AND sale_price >= 0),
+            revenue INTEGER NOT NULL CHECK (typeof(revenue) = 'integer' AND revenue >= 0),
+            profit INTEGER NOT NULL CHECK (typeof(profit) = 'integer'),
+            date TEXT,
+            FOREIGN KEY(fragrance_id) REFERENCES fragrances(id) ON DELETE CASCADE,
+            FOREIGN KEY(customer_id) REFERENCES customers(id) ON DELETE CASCADE
+        )
+    """, """
+        id, fragrance_id, customer_id, CAST(qty_sold AS INTEGER),
+        MAX(0, CAST(ROUND(COALESCE(unit_cost, 0) * 100) AS INTEGER)),
+        MAX(0, CAST(ROUND(COALESCE(sale_price, 0) * 100) AS INTEGER)),
+        MAX(0, CAST(ROUND(COALESCE(revenue, 0) * 100) AS INTEGER)),
+        CAST(ROUND(COALESCE(profit, 0) * 100) AS INTEGER), date
+    """),
+    "supplies": ("""
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE,
+            price INTEGER NOT NULL DEFAULT 0 CHECK (typeof(price) = 'integer' AND price >= 0),
+            purchase_link TEXT,
+            quantity INTEGER NOT NULL DEFAULT 0 CHECK (typeof(quantity) = 'integer' AND quantity >= 0)
+        )
+    """, """
+        id, name, MAX(0, CAST(ROUND(COALESCE(price, 0) * 100) AS INTEGER)),
+        purchase_link, MAX(0, CAST(COALESCE(quantity, 0) AS INTEGER))
+    """),
+    "oils": ("""
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE,
+            size REAL NOT NULL DEFAULT 0 CHECK (size >= 0),
+            price INTEGER NOT NULL DEFAULT 0 CHECK (typeof(price) = 'integer' AND price >= 0),
+            purchase_link TEXT,
+            quantity INTEGER NOT NULL DEFAULT 0 CHECK (typeof(quantity) = 'integer' AND quantity >= 0)
+        )
+    """, """
+        id, name, MAX(0, CAST(COALESCE(size, 0) AS REAL)),
+        MAX(0, CAST(ROUND(COALESCE(price, 0) * 100) AS INTEGER)),
+        purchase_link, MAX(0, CAST(COALESCE(quantity, 0) AS INTEGER))
+    """),
+}
+
+def _rebuild_table(c, table, create_sql, select_sql):
+    """Recreate table with a new definition, keeping ids and the AUTOINCREMENT counter."""
+    c.execute("SELECT seq FROM sqlite_sequence WHERE name=?", (table,))
+    seq = c.fetchone()
+    c.execute(create_sql.format(name=table + "_new"))
+    c.execute(f"INSERT INTO {table}_new SELECT {select_sql} FROM {table}")
+    c.execute(f"DROP TABLE {table}")
+    c.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    if seq:
+        c.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name=?", (seq[0], table))
+
+# Columns holding money in the pre-cents schema.
+LEGACY_MONEY_COLUMNS = {
+    "fragrances": ("unit_cost", "sale_price"),
+    "sales": ("unit_cost", "sale_price", "revenue", "profit"),
+    "supplies": ("price",),
+    "oils": ("price",),
+}
+# Sales that cannot meet the new qty_sold CHECK (no positive quantity)
+_UNSELLABLE = "qty_sold IS NULL OR CAST(qty_sold AS INTEGER) <= 0"
+_upgrade_notes = []     # notes written by the migrations of the current init_db()
+
+def _note_upgrade(c, message):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS upgrade_log (
+            id INTEGER PRIMARY KEY,
+            date TEXT NOT NULL,
+            message TEXT NOT NULL
+        )
+    """)
+    c.execute("INSERT INTO upgrade_log (date, message) VALUES (datetime('now', 'localtime'), ?)", (message,))
+    _upgrade_notes.append(message)
+
+def _report_unparsed_money(c):
+    # REAL affinity already turned numeric text into numbers, so text left
+    # in a money column is something like 'abc' or ''; the rebuild stores it
+    # as 0, and negative amounts (other than profit) are clamped to 0 too.
+    for table, columns in LEGACY_MONEY_COLUMNS.items():
+        for column in columns:
+            c.execute(f"SELECT id FROM {table} WHERE typeof({column}) = 'text' ORDER BY id")
+            ids = [row[0] for row in c.fetchall()]
+            if ids:
+                shown = ", ".join(map(str, ids[:20])) + (", ..." if len(ids) > 20 else "")
+                _note_upgrade(c, f"{table}.{column} was not a number in {len(ids)} rows (ids {shown}); "
+                                 f"stored as 0.00")
+
+def _quarantine_unsellable_sales(c):
+    # Moved to sales_rejected unchanged, so nothing is lost and the rebuild
+    # cannot fail on them.
+    c.execute("CREATE TABLE IF NOT EXISTS sales_rejected AS SELECT * FROM sales WHERE 0")
+    c.execute(f"INSERT INTO sales_rejected SELECT * FROM sales WHERE {_UNSELLABLE}")
+    if c.rowcount > 0:
+        _note_upgrade(c, f"Moved {c.rowcount} sales with no positive quantity to sales_rejected")
+    c.execute(f"DELETE FROM sales WHERE {_UNSELLABLE}")
+
+def _store_money_as_cents(c):
+    _report_unparsed_money(c)
+    _quarantine_unsellable_sales(c)
+    for table, (create_sql, select_sql) in MONEY_SCHEMA.items():
+        _rebuild_table(c, table, create_sql, select_sql)
+    # Dropping the old tables took their triggers and indexes with them.
+    _create_fragrance_search(c)
+    _create_indexes(c)
+
+# inventory_summary holds one row per gender ('' for none) with the
+# catalogue totals the dashboard needs. Triggers on fragrances keep it
+# current inside the same transaction as every write, so reading it never
+# scans the catalogue.
+_SUMMARY_ADD = """
+    INSERT OR IGNORE INTO inventory_summary(gender) VALUES (COALESCE(new.gender, ''));
+    UPDATE inventory_summary SET
+        sku_count = sku_count + 1,
+        units = units + new.quantity,
+        total_cost = total_cost + new.unit_cost * new.quantity,
+        retail_value = retail_value + new.sale_price * new.quantity,
+        low_stock_count = low_stock_count + (new.quantity < {threshold})
+    WHERE gender = COALESCE(new.gender, '');
+"""
+_SUMMARY_REMOVE = """
+    UPDATE inventory_summary SET
+        sku_count = sku_count - 1,
+        units = units - old.quantity,
+        total_cost = total_cost - old.unit_cost * old.quantity,
+        retail_value = retail_value - old.sale_price * old.quantity,
+        low_stock_count = low_stock_count - (old.quantity < {threshold})
+    WHERE gender = COALESCE(old.gender, '');
+"""
+SUMMARY_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS inventory_summary_ai AFTER INSERT ON fragrances BEGIN"
+    + _SUMMARY_ADD + "END",
+    "CREATE TRIGGER IF NOT EXISTS inventory_summary_ad AFTER DELETE ON fragrances BEGIN"
+    + _SUMMARY_REMOVE + "END",
+    "CREATE TRIGGER IF NOT EXISTS inventory_summary_au "
+    "AFTER UPDATE OF gender, unit_cost, sale_price, quantity ON fragrances BEGIN"
+    + _SUMMARY_REMOVE + _SUMMARY_ADD + "END",
+]
+
+def _create_inventory_summary(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_summary (
+            gender TEXT PRIMARY KEY,
+            sku_count INTEGER NOT NULL DEFAULT 0,
+            units INTEGER NOT NULL DEFAULT 0,
+            total_cost INTEGER NOT NULL DEFAULT 0,
+            retail_value INTEGER NOT NULL DEFAULT 0,
+            low_stock_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    c.execute("DELETE FROM inventory_summary")
+    c.execute(f"""
+        INSERT INTO inventory_summary
+        SELECT COALESCE(gender, ''), COUNT(*), SUM(quantity), SUM(unit_cost * quantity),
+               SUM(sale_price * quantity), SUM(quantity < {LOW_STOCK_THRESHOLD})
+        FROM fragrances GROUP BY COALESCE(gender, '')
+    """)
+    for trigger in SUMMARY_TRIGGERS:
+        c.execute(trigger.format(threshold=LOW_STOCK_THRESHOLD))
+    # Partial index: the low-stock report reads only the rows it lists.
+    c.execute(f"CREATE INDEX IF NOT EXISTS idx_fragrances_low_stock ON fragrances(quantity) "
+              f"WHERE quantity < {LOW_STOCK_THRESHOLD}")
+
+# Cached per-period sales aggregates for reports.py. sales_rollup_periods
+# records which (grain, dimension, period) have been computed, including
+# empty ones; sales_rollup_cache holds their rows. Any write to sales drops
+# the periods containing the old and new sale dates.
+_ROLLUP_INVALIDATE = """
+    DELETE FROM sales_rollup_cache WHERE period_start <= date({row}.date) AND date({row}.date) < period_end;
+    DELETE FROM sales_rollup_periods WHERE period_start <= date({row}.date) AND date({row}.date) < period_end;
+"""
+ROLLUP_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS sales_rollup_ai AFTER INSERT ON sales BEGIN"
+    + _ROLLUP_INVALIDATE.format(row="new") + "END",
+    "CREATE TRIGGER IF NOT EXISTS sales_rollup_ad AFTER DELETE ON sales BEGIN"
+    + _ROLLUP_INVALIDATE.format(row="old") + "END",
+    "CREATE TRIGGER IF NOT EXISTS sales_rollup_au AFTER UPDATE ON sales BEGIN"
+    + _ROLLUP_INVALIDATE.format(row="old") + _ROLLUP_INVALIDATE.format(row="new") + "END",
+]
+
+def _create_sales_rollups(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS sales_rollup_periods (
+            grain TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            period_start TEXT NOT NULL,
+            period_end TEXT NOT NULL,
+            PRIMARY KEY (grain, dimension, period_start)
+        )
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS sales_rollup_cache (
+            grain TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            period_start TEXT NOT NULL,
+            period_end TEXT NOT NULL,
+            key INTEGER,
+            units INTEGER NOT NULL,
+            revenue INTEGER NOT NULL,
+            profit INTEGER NOT NULL,
+            sale_count INTEGER NOT NULL
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sales_rollup_cache "
+              "ON sales_rollup_cache(grain, dimension, period_start)")
+    for trigger in ROLLUP_TRIGGERS:
+        c.execute(trigger)
+
+def _index_sales_by_date(c):
+    # Keyset pages filtered by fragrance or customer walk these in
+    # (key, date) order; they also cover the ON DELETE CASCADE lookups the
+    # single-column indexes served.
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sales_fragrance_date ON sales(fragrance_id, date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_sales_customer_date ON sales(customer_id, date)")
+    c.execute("DROP INDEX IF EXISTS idx_sales_fragrance")
+    c.execute("DROP INDEX IF EXISTS idx_sales_customer")
+
+def _index_customer_lookup(c):
+    # Prefix ranges for the customer picker; NOCASE so "ann" finds "Ann".
+    c.execute("CREATE INDEX IF NOT EXISTS idx_customers_name ON customers(name COLLATE NOCASE)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_customers_email ON customers(email COLLATE NOCASE)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_customers_phone ON customers(phone)")
+
+# customer_stats holds one row per customer who has bought anything: sale
+# rows, lifetime revenue and profit (cents) and the latest sale date.
+# Triggers on sales keep it current like inventory_summary; removing a sale
+# re-reads the customer's latest date from idx_sales_customer_date, and a
+# customer's row goes once their last sale does.
+_STATS_ADD = """
+    INSERT OR IGNORE INTO customer_stats(customer_id) SELECT new.customer_id WHERE new.customer_id IS NOT NULL;
+    UPDATE customer_stats SET
+        order_count = order_count + 1,
+        revenue = revenue + new.revenue,
+        profit = profit + new.profit,
+        last_purchase = CASE WHEN last_purchase IS NULL OR new.date > last_purchase
+                             THEN new.date ELSE last_purchase END
+    WHERE customer_id = new.customer_id;
+"""
+_STATS_REMOVE = """
+    UPDATE customer_stats SET
+        order_count = order_count - 1,
+        revenue = revenue - old.revenue,
+        profit = profit - old.profit,
+        last_purchase = (SELECT MAX(date) FROM sales WHERE customer_id = old.customer_id)
+    WHERE customer_id = old.customer_id;
+    DELETE FROM customer_stats WHERE customer_id = old.customer_id AND order_count = 0;
+"""
+CUSTOMER_STATS_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS customer_stats_ai AFTER INSERT ON sales BEGIN"
+    + _STATS_ADD + "END",
+    "CREATE TRIGGER IF NOT EXISTS customer_stats_ad AFTER DELETE ON sales BEGIN"
+    + _STATS_REMOVE + "END",
+    "CREATE TRIGGER IF NOT EXISTS customer_stats_au "
+    "AFTER UPDATE OF customer_id, revenue, profit, date ON sales BEGIN"
+    + _STATS_REMOVE + _STATS_ADD + "END",
+]
+
+def _create_customer_stats(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS customer_stats (
+            customer_id INTEGER PRIMARY KEY,
+            order_count INTEGER NOT NULL DEFAULT 0,
+            revenue INTEGER NOT NULL DEFAULT 0,
+            profit INTEGER NOT NULL DEFAULT 0,
+            last_purchase TEXT
+        )
+    """)
+    c.execute("DELETE FROM customer_stats")
+    c.execute("""
+        INSERT INTO customer_stats
+        SELECT customer_id, COUNT(*), SUM(revenue), SUM(profit), MAX(date)
+        FROM sales WHERE customer_id IS NOT NULL GROUP BY customer_id
+    """)
+    for trigger in CUSTOMER_STATS_TRIGGERS:
+        c.execute(trigger)
+    # "Top spenders" walks this backwards; city joins the picker's prefixes.
+    c.execute("CREATE INDEX IF NOT EXISTS idx_customer_stats_revenue ON customer_stats(revenue)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_customers_city ON customers(city COLLATE NOCASE)")
+
+MIGRATIONS = [
+    _create_tables,
+    _add_image_hash,
+    _create_fragrance_search,
+    _create_indexes,
+    _store_money_as_cents,
+    _create_inventory_summary,
+    _create_sales_rollups,
+    _index_sales_by_date,
+    _index_customer_lookup,
+    _create_customer_stats,
+]
+
+_fts_available = None
+
+def _has_fts():
+    global _fts_available
+    if _fts_available is None:
+        with get_conn() as conn:
+            row = conn.execute("SELECT 1 FROM sqlite_master WHERE name='fragrances_fts'").fetchone()
+        _fts_available = row is not None
+    return _fts_available
 
 # ---------------- FRAGRANCES ----------------
-def insert_fragrance(data):
+def _fragrance_params(data):
+    name, description, gender, category, unit_cost, sale_price, inspired_by, quantity, image = data
+    return (name, description, gender, category,
+            to_cents(unit_cost, "Unit Cost"), to_cents(sale_price, "Sale Price"),
+            inspired_by, to_quantity(quantity), image)
+
+def insert_fragrance(data, image_hash=None):
+    params = _fragrance_params(data)
     with get_conn() as conn:
         c = conn.cursor()
         c.execute("""
             INSERT INTO fragrances 
-            (name, description, gender, category, unit_cost, sale_price, inspired_by, quantity, image)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, data)
+            (name, description, gender, category, unit_cost, sale_price, inspired_by, quantity, image, image_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (*params, image_hash))
         conn.commit()
+    _touch("fragrances")
+    return c.lastrowid
+
+def get_all_fragrances():
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT * FROM fragrances ORDER BY id")
+        return c.fetchall()
 
 def get_all_fragrances_by_gender(gender):
     with get_conn() as conn:
@@ -95,6 +787,56 @@ def get_all_fragrances_by_gender(gender):
         c.execute("SELECT * FROM fragrances WHERE gender=?", (gender,))
         return c.fetchall()
 
+def _like_pattern(query):
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def _match_clause(query):
+    """SQL condition (and params) matching fragrances against a search string.
+
+    Queries of 3+ characters go through the trigram FTS index; shorter ones
+    match too much of the catalogue to benefit and use LIKE instead.
+    """
+    if _has_fts() and len(query) >= 3:
+        phrase = '"' + query.replace('"', '""') + '"'
+        return "id IN (SELECT rowid FROM fragrances_fts WHERE fragrances_fts MATCH ?)", [phrase]
+    pattern = _like_pattern(query)
+    return ("(name LIKE ? ESCAPE '\\' OR inspired_by LIKE ? ESCAPE '\\' OR description LIKE ? ESCAPE '\\')",
+            [pattern, pattern, pattern])
+
+def _fragrance_filter(gender, query):
+    sql, params = " WHERE gender=?", [gender]
+    if query:
+        clause, match_params = _match_clause(query)
+        sql += " AND " + clause
+        params += match_params
+    return sql, params
+
+def search_fragrances(query, gender=None):
+    """All fragrances matching query (name, inspired_by or description), any gender unless given."""
+    clause, params = _match_clause(query)
+    if gender:
+        clause += " AND gender=?"
+        params.append(gender)
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT * FROM fragrances WHERE " + clause + " ORDER BY id", params)
+        return c.fetchall()
+
+def count_fragrances_by_gender(gender, query=None):
+    where, params = _fragrance_filter(gender, query)
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT COUNT(*) FROM fragrances" + where, params)
+        return c.fetchone()[0]
+
+def get_fragrances_page(gender, offset, limit, query=None):
+    where, params = _fragrance_filter(gender, query)
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT * FROM fragrances" + where + " ORDER BY id LIMIT ? OFFSET ?", (*params, limit, offset))
+        return c.fetchall()
+
 def get_fragrance_by_id(fid):
     with get_conn() as conn:
         c = conn.cursor()
@@ -107,27 +849,79 @@ def get_fragrance_by_name(name):
         c.execute("SELECT * FROM fragrances WHERE name=?", (name,))
         return c.fetchone()
 
-def update_fragrance(fid, data):
+def update_fragrance(fid, data, image_hash=None):
+    params = _fragrance_params(data)
     with get_conn() as conn:
         c = conn.cursor()
         c.execute("""
             UPDATE fragrances
-            SET name=?, description=?, gender=?, category=?, unit_cost=?, sale_price=?, inspired_by=?, quantity=?, image=?
+            SET name=?, description=?, gender=?, category=?, unit_cost=?, sale_price=?, inspired_by=?, quantity=?, image=?, image_hash=?
             WHERE id=?
-        """, (*data, fid))
+        """, (*params, image_hash, fid))
+        conn.commit()
+    _touch("fragrances")
+
+def get_unimported_images():
+    """(id, image) of fragrances whose image predates the image store (no image_hash)."""
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT id, image FROM fragrances WHERE image_hash IS NULL AND image IS NOT NULL AND image != ''")
+        return c.fetchall()
+
+def set_imported_image(fid, original, image, image_hash):
+    """Point fragrance fid at its copy in the image store.
+
+    Only applies while the row still names original and has no hash, so an
+    edit made in the meantime wins. Returns whether the row was updated.
+    """
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("UPDATE fragrances SET image=?, image_hash=? WHERE id=? AND image=? AND image_hash IS NULL",
+                  (image, image_hash, fid, original))
         conn.commit()
+    _touch("fragrances")
+    return c.rowcount > 0
 
 def delete_fragrance(fid):
     with get_conn() as conn:
         c = conn.cursor()
         c.execute("DELETE FROM fragrances WHERE id=?", (fid,))
         conn.commit()
+    _touch("fragrances", "sales")
 
 def update_fragrance_quantity(fid, quantity):
+    quantity = to_quantity(quantity)
     with get_conn() as conn:
         c = conn.cursor()
         c.execute("UPDATE fragrances SET quantity=? WHERE id=?", (quantity, fid))
         conn.commit()
+    _touch("fragrances")
+
+# ---------------- INVENTORY SUMMARY ----------------
+def get_inventory_summary():
+    """Per-gender (gender, sku_count, units, total_cost, retail_value, low_stock_count); money in cents."""
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT * FROM inventory_summary WHERE sku_count > 0 ORDER BY gender")
+        return c.fetchall()
+
+def get_inventory_totals():
+    """Catalogue-wide (sku_count, units, total_cost, retail_value, low_stock_count)."""
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("""
+            SELECT COALESCE(SUM(sku_count), 0), COALESCE(SUM(units), 0), COALESCE(SUM(total_cost), 0),
+                   COALESCE(SUM(retail_value), 0), COALESCE(SUM(low_stock_count), 0)
+            FROM inventory_summary
+        """)
+        return c.fetchone()
+
+def get_low_stock_fragrances():
+    with get_conn() as conn:
+        c = conn.cursor()
+        # The literal threshold lets SQLite use the partial index.
+        c.execute(f"SELECT * FROM fragrances WHERE quantity < {LOW_STOCK_THRESHOLD} ORDER BY quantity, name")
+        return c.fetchall()
 
 # ---------------- CUSTOMERS ----------------
 def insert_customer(data):
@@ -135,6 +929,8 @@ def insert_customer(data):
         c = conn.cursor()
         c.execute("INSERT INTO customers (name,email,phone,city,reference) VALUES (?, ?, ?, ?, ?)", data)
         conn.commit()
+    _touch("customers")
+    return c.lastrowid
 
 def get_all_customers():
     with get_conn() as conn:
@@ -142,6 +938,113 @@ def get_all_customers():
         c.execute("SELECT * FROM customers")
         return c.fetchall()
 
+CUSTOMER_PAGE_SIZE = 50
+CUSTOMER_SCAN_THRESHOLD = 5000
+LAPSED_DAYS = 90
+_PREFIX_END = "\U0010ffff"   # sorts after anything that can follow a prefix
+_CUSTOMER_PREFIX = {
+    "name": "c.name >= ? COLLATE NOCASE AND c.name < ? COLLATE NOCASE",
+    "email": "c.email >= ? COLLATE NOCASE AND c.email < ? COLLATE NOCASE",
+    "phone": "c.phone >= ? AND c.phone < ?",
+    "city": "c.city >= ? COLLATE NOCASE AND c.city < ? COLLATE NOCASE",
+}
+# Appended to each customer row by search_customers(with_stats=True)
+CUSTOMER_STATS_COLUMNS = ("COALESCE(st.order_count, 0), COALESCE(st.revenue, 0), "
+                          "COALESCE(st.profit, 0), st.last_purchase")
+CUSTOMER_SEGMENTS = {
+    "all": "",
+    "repeat": "st.order_count >= 2",
+    "one-time": "st.order_count = 1",
+    "none": "st.customer_id IS NULL",
+    # last_purchase is a local date (sales are dated with the local clock)
+    "lapsed": f"st.last_purchase < date('now', 'localtime', '-{LAPSED_DAYS} days')",
+}
+
+def customer_key(row):
+    """Keyset position (name, id) of a row returned by search_customers()."""
+    return (row[1], row[0])
+
+def customer_revenue_key(row):
+    """Keyset position (revenue, id) of a row from search_customers(sort="revenue")."""
+    return (row[7], row[0])
+
+def search_customers(prefix="", after=None, limit=CUSTOMER_PAGE_SIZE, with_stats=False,
+                     sort="name", segment="all"):
+    """Customers whose name, email, phone or city starts with prefix.
+
+    Matching ignores case. Rows are sorted by name then id, or with
+    sort="revenue" by lifetime revenue, highest first, which lists only
+    customers who have bought something. after is the customer_key() (or
+    customer_revenue_key()) of the last row already seen. with_stats adds
+    the customer_stats rollup (orders, revenue, profit, last purchase) to
+    each row; sort="revenue" and segments other than "all" imply it.
+    sort="revenue" with segment="none" would always be empty and raises
+    ValueError.
+
+    Up to CUSTOMER_SCAN_THRESHOLD matches are collected from the prefix
+    indexes and sorted; past that, matches are dense enough that walking
+    the sort index in order fills a page sooner.
+    """
+    by_revenue = sort == "revenue"
+    if by_revenue and segment == "none":
+        raise ValueError("Customers with no purchases have no revenue to sort by")
+    with_stats = with_stats or by_revenue or segment != "all"
+    where, params, hint = [], [], ""
+    if CUSTOMER_SEGMENTS[segment]:
+        where.append(CUSTOMER_SEGMENTS[segment])
+    prefix = prefix.strip()
+    with get_conn() as conn:
+        c = conn.cursor()
+        if prefix:
+            bounds = (prefix, prefix + _PREFIX_END)
+            selects = [f"SELECT id FROM customers c WHERE {clause}" for clause in _CUSTOMER_PREFIX.values()]
+            # UNION ALL stops at the limit; a customer matching twice only
+            # tips a borderline count towards the scan
+            c.execute(f"SELECT COUNT(*) FROM ({' UNION ALL '.join(selects)} LIMIT ?)",
+                      (*bounds * len(selects), CUSTOMER_SCAN_THRESHOLD))
+            if c.fetchone()[0] < CUSTOMER_SCAN_THRESHOLD:
+                where.append(f"c.id IN ({' UNION '.join(selects)})")
+            else:
+                where.append("(" + " OR ".join(f"({clause})" for clause in _CUSTOMER_PREFIX.values()) + ")")
+                hint = "INDEXED BY " + ("idx_customer_stats_revenue" if by_revenue else "idx_customers_name")
+            params.extend(bounds * len(selects))
+        if by_revenue:
+            if after is not None:
+                after_revenue, after_id = after
+                where.append("st.revenue <= ? AND (st.revenue < ? OR st.customer_id < ?)")
+                params.extend((after_revenue, after_revenue, after_id))
+            source = f"customer_stats st {hint} JOIN customers c ON c.id = st.customer_id"
+            order = "st.revenue DESC, st.customer_id DESC"
+        else:
+            if after is not None:
+                after_name, after_id = after
+                if after_name is None:
+                    # NULL names sort first
+                    where.append("((c.name IS NULL AND c.id > ?) OR c.name IS NOT NULL)")
+                    params.append(after_id)
+                else:
+                    where.append("c.name >= ? COLLATE NOCASE AND (c.name > ? COLLATE NOCASE OR c.id > ?)")
+                    params.extend((after_name, after_name, after_id))
+            source = f"customers c {hint}"
+            if with_stats:
+                source += " LEFT JOIN customer_stats st ON st.customer_id = c.id"
+            order = "c.name COLLATE NOCASE, c.id"
+        c.execute(f"""
+            SELECT c.*{", " + CUSTOMER_STATS_COLUMNS if with_stats else ""} FROM {source}
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY {order}
+            LIMIT ?
+        """, (*params, limit))
+        return c.fetchall()
+
+def get_customer_stats(cid):
+    """(orders, revenue, profit, last purchase) for one customer; zeros if they never bought."""
+    with get_conn() as conn:
+        c = conn.cursor()
+        c.execute("SELECT order_count, revenue, profit, last_purchase FROM customer_stats WHERE customer_id=?",
+                  (cid,))
+        return c.fetchone() or (0, 0, 0, None)
+
 def get_customer_by_id(cid):
     with get_conn() as conn:
         c = conn.cursor()
@@ -157,41 +1060,168 @@ def update_customer(cid, data):
             WHERE id=?
         """, (*data, cid))
         conn.commit()
+    _touch("customers")
 
 def delete_customer(cid):
     with get_conn() as conn:
         c = conn.cursor()
         c.execute("DELETE FROM customers WHERE id=?", (cid,))
         conn.commit()
+    _touch("customers", "sales")
 
 # ---------------- SALES ----------------
+class SaleError(Exception):
+    pass
+
+class InsufficientStockError(SaleError):
+    def __init__(self, available, name=None):
+        where = f" for {name}" if name else ""
+        super().__init__(f"Not enough stock{where}. Available: {available}")
+        self.available = available
+        self.name = name
+
+# Sale row priced from the fragrance's current cost and price.
+SALE_FROM_FRAGRANCE_SQL = """
+    INSERT INTO sales
+    (fragrance_id, customer_id, qty_sold, unit_cost, sale_price, revenue, profit, date)
+    SELECT id, ?, ?, unit_cost, sale_price, sale_price * ?, (sale_price - unit_cost) * ?, ?
+    FROM fragrances WHERE id=?
+"""
+
+def record_sale(fid, customer_id, qty, date):
+    """Sell qty of fragrance fid: stock check, decrement and sale row in one transaction.
+
+    Raises InsufficientStockError if fewer than qty are in stock. Returns the new sale id.
+    """
+    with transaction() as conn:
+        c = conn.cursor()
+        c.execute("UPDATE fragrances SET quantity = quantity - ? WHERE id=? AND quantity >= ?", (qty, fid, qty))
+        if c.rowcount == 0:
+            c.execute("SELECT quantity FROM fragrances WHERE id=?", (fid,))
+            row = c.fetchone()
+            if row is None:
+                raise SaleError("Fragrance not found")
+            raise InsufficientStockError(row[0])
+        c.execute(SALE_FROM_FRAGRANCE_SQL, (customer_id, qty, qty, qty, date, fid))
+        sale_id = c.lastrowid
+    _touch("fragrances", "sales")
+    return sale_id
+
+def record_basket_sale(customer_id, lines, date):
+    """Sell several fragrances to one customer in a single transaction.
+
+    lines is an iterable of (fragrance_id, qty); repeated fragrances are
+    merged. Stock for every line is checked first, then all quantities are
+    decremented and all sale rows inserted with executemany. If any line is
+    short, InsufficientStockError names it and nothing is written.
+    Returns the number of sale rows written.
+    """
+    totals = {}
+    for fid, qty in lines:
+        totals[fid] = totals.get(fid, 0) + qty
+    if not totals:
+        return 0
+    with transaction() as conn:
+        c = conn.cursor()
+        placeholders = ",".join("?" * len(totals))
+        c.execute(f"SELECT id, name, quantity FROM fragrances WHERE id IN ({placeholders})", list(totals))
+        stock = {row[0]: row for row in c.fetchall()}
+        for fid, qty in totals.items():
+            if fid not in stock:
+                raise SaleError(f"Fragrance {fid} not found")
+            _, name, available = stock[fid]
+            if (available or 0) < qty:
+                raise InsufficientStockError(available, name)
+        c.executemany("UPDATE fragrances SET quantity = quantity - ? WHERE id=? AND quantity >= ?",
+                      [(qty, fid, qty) for fid, qty in totals.items()])
+        c.executemany(SALE_FROM_FRAGRANCE_SQL,
+                      [(customer_id, qty, qty, qty, date, fid) for fid, qty in totals.items()])
+    _touch("fragrances", "sales")
+    return len(totals)
+
 def insert_sale(data):
+    fragrance_id, customer_id, qty_sold, unit_cost, sale_price, revenue, profit, date = data
+    params = (fragrance_id, customer_id, to_quantity(qty_sold, "Qty Sold"),
+              to_cents(unit_cost, "Unit Cost"), to_cents(sale_price, "Sale Price"),
+              to_cents(revenue, "Revenue"), to_cents(profit, "Profit", signed=True), date)
     with get_conn() as conn:
         c = conn.cursor()
         c.execute("""
             INSERT INTO sales
             (fragrance_id, customer_id, qty_sold, unit_cost, sale_price, revenue, profit, date)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, data)
+        """, params)
         conn.commit()
+    _touch("sales")
 
-def get_all_sales():
-    with get_conn() as conn:
-        c = conn.cursor()
-        c.execute("""
-            SELECT s.id, f.name, c.name, s.qty_sold, s.unit_cost, s.sale_price, s.revenue, s.profit, s.date
-            FROM sales s
-            LEFT JOIN fragrances f ON s.fragrance_id = f.id
-            LEFT JOIN customers c ON s.customer_id = c.id
-        """)
-        return c.fetchall()
+SALE_COLUMNS = "s.id, f.name, c.name, s.qty_sold, s.unit_cost, s.sale_price, s.revenue, s.profit, s.date"
+
+def sale_key(row):
+    """Keyset position (date, id) of a row returned by iter_sales()."""
+    return (row[8], row[0])
+
+def iter_sales(after=None, limit=None, fragrance_id=None, customer_id=None, start=None, end=None):
+    """Yield joined sales rows ordered by (date, id), straight off the cursor.
+
+    after is the sale_key() of the last row already seen; rows past it are
+    found with an index range scan, so a page costs the same however deep
+    into the history it starts. start is inclusive and end exclusive, both
+    compared with the stored date text (e.g. "2024-01-31").
+    """
+    where, params = [], []
+    if fragrance_id is not None:
+        where.append("s.fragrance_id = ?")
+        params.append(fragrance_id)
+    if customer_id is not None:
+        where.append("s.customer_id = ?")
+        params.append(customer_id)
+    if start:
+        where.append("s.date >= ?")
+        params.append(start)
+    if end:
+        where.append("s.date < ?")
+        params.append(end)
+    if after is not None:
+        after_date, after_id = after
+        if after_date is None:
+            # NULL dates sort first and never compare true in a row value
+            where.append("((s.date IS NULL AND s.id > ?) OR s.date IS NOT NULL)")
+            params.append(after_id)
+        else:
+            where.append("(s.date, s.id) > (?, ?)")
+            params.extend((after_date, after_id))
+    sql = f"""
+        SELECT {SALE_COLUMNS}
+        FROM sales s
+        LEFT JOIN fragrances f ON s.fragrance_id = f.id
+        LEFT JOIN customers c ON s.customer_id = c.id
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY s.date, s.id
+    """
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    with closing(get_conn().cursor()) as c:
+        c.execute(sql, params)
+        yield from c
+
+def get_sales_after(after, limit, **filters):
+    """One keyset page of iter_sales(): up to limit rows following after."""
+    return list(iter_sales(after, limit, **filters))
 
 # ---------------- SUPPLIES ----------------
+def _supply_params(data):
+    name, price, purchase_link, quantity = data
+    return name, to_cents(price, "Price"), purchase_link, to_quantity(quantity)
+
 def insert_supply(data):
+    params = _supply_params(data)
     with get_conn() as conn:
         c = conn.cursor()
-        c.execute("INSERT INTO supplies (name, price, purchase_link, quantity) VALUES (?, ?, ?, ?)", data)
+        c.execute("INSERT INTO supplies (name, price, purchase_link, quantity) VALUES (?, ?, ?, ?)", params)
         conn.commit()
+    _touch("supplies")
+    return c.lastrowid
 
 def get_all_supplies():
     with get_conn() as conn:
@@ -212,27 +1242,37 @@ def get_supply_by_name(name):
         return c.fetchone()
 
 def update_supply(sid, data):
+    params = _supply_params(data)
     with get_conn() as conn:
         c = conn.cursor()
         c.execute("""
             UPDATE supplies
             SET name=?, price=?, purchase_link=?, quantity=?
             WHERE id=?
-        """, (*data, sid))
+        """, (*params, sid))
         conn.commit()
+    _touch("supplies")
 
 def delete_supply(sid):
     with get_conn() as conn:
         c = conn.cursor()
         c.execute("DELETE FROM supplies WHERE id=?", (sid,))
         conn.commit()
+    _touch("supplies")
 
 # ---------------- OILS ----------------
+def _oil_params(data):
+    name, size, price, purchase_link, quantity = data
+    return name, to_size(size, "Size"), to_cents(price, "Price"), purchase_link, to_quantity(quantity)
+
 def insert_oil(data):
+    params = _oil_params(data)
     with get_conn() as conn:
         c = conn.cursor()
-        c.execute("INSERT INTO oils (name, size, price, purchase_link, quantity) VALUES (?, ?, ?, ?, ?)", data)
+        c.execute("INSERT INTO oils (name, size, price, purchase_link, quantity) VALUES (?, ?, ?, ?, ?)", params)
         conn.commit()
+    _touch("oils")
+    return c.lastrowid
 
 def get_all_oils():
     with get_conn() as conn:
@@ -253,20 +1293,186 @@ def get_oil_by_name(name):
         return c.fetchone()
 
 def update_oil(oid, data):
+    params = _oil_params(data)
     with get_conn() as conn:
         c = conn.cursor()
         c.execute("""
             UPDATE oils
             SET name=?, size=?, price=?, purchase_link=?, quantity=?
             WHERE id=?
-        """, (*data, oid))
+        """, (*params, oid))
         conn.commit()
+    _touch("oils")
 
 def delete_oil(oid):
     with get_conn() as conn:
         c = conn.cursor()
         c.execute("DELETE FROM oils WHERE id=?", (oid,))
         conn.commit()
+    _touch("oils")
+
+# ---------------- BULK IMPORT / EXPORT ----------------
+# Columns of each table as exported and imported (see bulkio.py). Money is
+# written as decimal text ("12.50") and parsed back through to_cents().
+# Sales refer to their fragrance by name, since fragrance ids are not kept
+# across databases; customers and sales keep their ids.
+BULK_COLUMNS = {
+    "fragrances": ("name", "description", "gender", "category", "unit_cost", "sale_price",
+                   "inspired_by", "quantity", "image", "image_hash"),
+    "customers": ("id", "name", "email", "phone", "city", "reference"),
+    "sales": ("id", "fragrance", "customer_id", "qty_sold", "unit_cost", "sale_price",
+              "revenue", "profit", "date"),
+    "supplies": ("name", "price", "purchase_link", "quantity"),
+    "oils": ("name", "size", "price", "purchase_link", "quantity"),
+}
+BULK_MONEY_COLUMNS = {"unit_cost", "sale_price", "revenue", "profit", "price"}
+BULK_CHUNK_SIZE = 5000
+BULK_UPSERT_KEYS = {"fragrances": "name", "customers": "id", "sales": "id", "supplies": "name", "oils": "name"}
+
+def _bulk_export_sql(table):
+    if table == "sales":
+        return """
+            SELECT s.id, f.name, s.customer_id, s.qty_sold, s.unit_cost, s.sale_price, s.revenue, s.profit, s.date
+            FROM sales s LEFT JOIN fragrances f ON s.fragrance_id = f.id
+            ORDER BY s.id
+        """
+    return f"SELECT {', '.join(BULK_COLUMNS[table])} FROM {table} ORDER BY id"
+
+def _bulk_upsert_sql(table):
+    columns = ["fragrance_id" if col == "fragrance" else col for col in BULK_COLUMNS[table]]
+    key = BULK_UPSERT_KEYS[table]
+    updates = ", ".join(f"{col} = excluded.{col}" for col in columns if col != key)
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT({key}) DO UPDATE SET {updates}")
+
+def _record_id(value):
+    if value in (None, ""):
+        return None
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        raise ValueError(f"Invalid id: {value!r}") from None
+
+def _bulk_params(table, r):
+    """Parameters for _bulk_upsert_sql() from one imported record (a dict).
+
+    Absent or blank numbers count as 0; anything else goes through the same
+    validation as the forms.
+    """
+    if BULK_UPSERT_KEYS[table] == "name" and not r.get("name"):
+        raise ValueError("Name is required")
+    get = lambda col: r.get(col) if r.get(col) not in (None, "") else 0
+    text = lambda col: r.get(col) if r.get(col) is not None else ""
+    if table == "fragrances":
+        return _fragrance_params((r.get("name"), text("description"), text("gender"), text("category"),
+                                  get("unit_cost"), get("sale_price"), text("inspired_by"),
+                                  get("quantity"), text("image"))) + (r.get("image_hash") or None,)
+    if table == "customers":
+        return (_record_id(r.get("id")), r.get("name"), text("email"), text("phone"), text("city"), text("reference"))
+    if table == "sales":
+        return (_record_id(r.get("id")), r.get("fragrance"), _record_id(r.get("customer_id")),
+                to_quantity(get("qty_sold"), "Qty Sold"),
+                to_cents(get("unit_cost"), "Unit Cost"), to_cents(get("sale_price"), "Sale Price"),
+                to_cents(get("revenue"), "Revenue"), to_cents(get("profit"), "Profit", signed=True),
+                r.get("date") or None)
+    if table == "supplies":
+        return _supply_params((r.get("name"), get("price"), text("purchase_link"), get("quantity")))
+    return _oil_params((r.get("name"), get("size"), get("price"), text("purchase_link"), get("quantity")))
+
+def _resolve_sale_fragrances(conn, params, first_row):
+    """Swap fragrance names in sales params for ids; unknown names are an error."""
+    names = {p[1] for p in params if p[1] is not None}
+    ids = {}
+    if names:
+        marks = ", ".join("?" * len(names))
+        ids = dict(conn.execute(f"SELECT name, id FROM fragrances WHERE name IN ({marks})", list(names)))
+    resolved = []
+    for number, p in enumerate(params, first_row):
+        if p[1] is not None and p[1] not in ids:
+            raise ValueError(f"Row {number}: unknown fragrance {p[1]!r}")
+        resolved.append((p[0], ids.get(p[1]), *p[2:]))
+    return resolved
+
+# Tables keyed by a unique name: (param converter, insert columns)
+_NAMED_ROWS = {
+    "fragrances": (_fragrance_params, "name, description, gender, category, unit_cost, sale_price, "
+                                      "inspired_by, quantity, image"),
+    "supplies": (_supply_params, "name, price, purchase_link, quantity"),
+    "oils": (_oil_params, "name, size, price, purchase_link, quantity"),
+}
+
+def insert_missing(table, rows):
+    """Insert the rows (form-style tuples, name first) whose name is not in table yet.
+
+    One IN query finds the names already present, so the usual case of
+    nothing missing costs a single read; anything missing goes in with one
+    executemany(). Existing rows are never modified. Returns the number
+    inserted.
+    """
+    convert, columns = _NAMED_ROWS[table]
+    rows = list(rows)
+    if not rows:
+        return 0
+    with get_conn() as conn:
+        marks = ", ".join("?" * len(rows))
+        present = {r[0] for r in conn.execute(f"SELECT name FROM {table} WHERE name IN ({marks})",
+                                              [row[0] for row in rows])}
+    missing = [convert(row) for row in rows if row[0] not in present]
+    if not missing:
+        return 0
+    with transaction() as conn:
+        conn.executemany(f"INSERT INTO {table} ({columns}) VALUES ({', '.join('?' * len(missing[0]))}) "
+                         f"ON CONFLICT(name) DO NOTHING", missing)
+    _touch(table)
+    return len(missing)
+
+def export_rows(table):
+    """Yield every row of table in BULK_COLUMNS order, money as decimal text."""
+    if table not in BULK_COLUMNS:
+        raise ValueError(f"Unknown table: {table}")
+    money = [col in BULK_MONEY_COLUMNS for col in BULK_COLUMNS[table]]
+    with closing(get_conn().cursor()) as c:
+        c.execute(_bulk_export_sql(table))
+        for row in c:
+            yield tuple(format_cents(v) if is_money and v is not None else v
+                        for v, is_money in zip(row, money))
+
+def import_records(table, records, chunk_size=BULK_CHUNK_SIZE, progress=None):
+    """Upsert an iterable of records (dicts keyed by BULK_COLUMNS) into table.
 
-# ---------------- INITIALIZE ----------------
-init_db()
+    Records are consumed chunk_size at a time and each chunk is written with
+    one executemany() in its own transaction, so memory stays flat however
+    long the input is. Rows matching an existing BULK_UPSERT_KEYS value are
+    updated in place. A bad row raises ValueError naming its row number;
+    chunks before it stay imported. progress(count) is called after every
+    chunk. Returns the number of records imported.
+    """
+    if table not in BULK_COLUMNS:
+        raise ValueError(f"Unknown table: {table}")
+    sql = _bulk_upsert_sql(table)
+    records = iter(records)
+    count = 0
+    try:
+        while True:
+            chunk = list(itertools.islice(records, chunk_size))
+            if not chunk:
+                break
+            params = []
+            for number, record in enumerate(chunk, count + 1):
+                try:
+                    if not isinstance(record, dict):
+                        raise ValueError("expected an object of column values")
+                    params.append(_bulk_params(table, record))
+                except ValueError as e:
+                    raise ValueError(f"Row {number}: {e}") from None
+            with transaction() as conn:
+                if table == "sales":
+                    params = _resolve_sale_fragrances(conn, params, count + 1)
+                conn.executemany(sql, params)
+            count += len(chunk)
+            if progress:
+                progress(count)
+    finally:
+        if count:
+            _touch(table)
+    return count
@@ -0,0 +1,179 @@
+import hashlib
+import os
+import queue
+import re
+import shutil
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageTk, features
+
+IMAGE_CACHE_BYTES = 64 * 1024 * 1024
+DECODE_WORKERS = 2
+RESULT_POLL_MS = 20
+HASH_CHUNK = 1024 * 1024
+THUMB_FORMAT, THUMB_EXT = ("WEBP", ".webp") if features.check("webp") else ("PNG", ".png")
+
+# ---------------- DECODING ----------------
+def image_key(path, size):
+    """Cache key for path at size; changes when the file is rewritten."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    return (os.path.abspath(path), mtime, tuple(size))
+
+def decode_image(path, size):
+    """Open path and scale it to size, letting JPEGs decode at reduced scale."""
+    with Image.open(path) as img:
+        if img.format == "JPEG":
+            img.draft("RGB", size)
+        img = img.convert("RGBA") if img.mode in ("P", "LA", "RGBA") else img.convert("RGB")
+        return img.resize(size)
+
+# ---------------- CONTENT-ADDRESSED STORE ----------------
+# Imported images live in the image directory as <sha256><ext>, next to
+# pre-scaled copies named <sha256>_<w>x<h><THUMB_EXT>. The hash is stored in
+# fragrances.image_hash so viewers can load the small copies directly.
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def thumbnail_path(image_dir, image_hash, size):
+    return os.path.join(image_dir, f"{image_hash}_{size[0]}x{size[1]}{THUMB_EXT}")
+
+def store_image(path, image_dir, sizes):
+    """Copy path into image_dir under its content hash and pre-scale it.
+
+    Returns (image_hash, stored_path). Re-importing an image that is already
+    in the store only creates thumbnails that are missing.
+    """
+    stem, ext = os.path.splitext(os.path.basename(path))
+    if (os.path.abspath(os.path.dirname(path)) == os.path.abspath(image_dir)
+            and re.fullmatch(r"[0-9a-f]{64}", stem)):
+        image_hash, stored = stem, path
+    else:
+        image_hash = file_hash(path)
+        stored = os.path.join(image_dir, image_hash + ext.lower())
+        os.makedirs(image_dir, exist_ok=True)
+        if not os.path.exists(stored):
+            shutil.copyfile(path, stored + ".tmp")
+            os.replace(stored + ".tmp", stored)
+    for size in sizes:
+        thumb = thumbnail_path(image_dir, image_hash, size)
+        if not os.path.exists(thumb):
+            decode_image(stored, tuple(size)).save(thumb + ".tmp", THUMB_FORMAT)
+            os.replace(thumb + ".tmp", thumb)
+    return image_hash, stored
+
+def _image_bytes(img):
+    w, h = img.size
+    # decoded pixels plus the Tk photo made from them
+    return w * h * (len(img.getbands()) + 4)
+
+
+# ---------------- CACHE ----------------
+class ImageCache:
+    """Bounded LRU cache of decoded, resized images.
+
+    Images are keyed by path, mtime and target size and evicted least
+    recently used first once their estimated pixel bytes pass max_bytes.
+    Decoding runs in a small thread pool; the PhotoImage for an entry is
+    created on the Tk thread the first time it is shown, and callbacks from
+    request() are delivered there through root.after() polling.
+    """
+
+    def __init__(self, root, max_bytes=IMAGE_CACHE_BYTES, workers=DECODE_WORKERS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()   # key -> [pil_image, photo, nbytes]
+        self._pending = {}              # key -> callbacks waiting on a decode
+        self._done = queue.Queue()
+        self._poll_id = None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-decode")
+
+    def get(self, path, size):
+        """PhotoImage for path at size if it is already decoded, else None."""
+        return self._photo(image_key(path, size))
+
+    def _photo(self, key):
+        entry = self._entries.get(key) if key else None
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        if entry[1] is None:
+            entry[1] = ImageTk.PhotoImage(entry[0])
+        return entry[1]
+
+    def request(self, path, size, callback):
+        """Call callback(photo_or_None) on the Tk thread once path is decoded."""
+        photo = self.get(path, size)
+        if photo is not None:
+            callback(photo)
+            return
+        self._decode(path, size, callback)
+
+    def prefetch(self, path, size):
+        """Decode path in the background so a later get() is a cache hit."""
+        key = image_key(path, size)
+        if key and key not in self._entries:
+            self._decode(path, size, None)
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _decode(self, path, size, callback):
+        key = image_key(path, size)
+        if key is None:
+            if callback:
+                callback(None)
+            return
+        callbacks = self._pending.get(key)
+        if callbacks is not None:
+            if callback:
+                callbacks.append(callback)
+            return
+        self._pending[key] = [callback] if callback else []
+        future = self._executor.submit(decode_image, path, tuple(size))
+        future.add_done_callback(lambda f, key=key: self._done.put((key, f)))
+        if self._poll_id is None:
+            self._poll_id = self.root.after(RESULT_POLL_MS, self._poll)
+
+    def _store(self, key, img):
+        nbytes = _image_bytes(img)
+        if key in self._entries:
+            self.bytes -= self._entries[key][2]
+        self._entries[key] = [img, None, nbytes]
+        self.bytes += nbytes
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+
+    def _poll(self):
+        self._poll_id = None
+        while True:
+            try:
+                key, future = self._done.get_nowait()
+            except queue.Empty:
+                break
+            callbacks = self._pending.pop(key, [])
+            try:
+                self._store(key, future.result())
+            except Exception as e:
+                print(f"Error decoding image {key[0]}: {e}")
+                for callback in callbacks:
+                    callback(None)
+                continue
+            photo = self._photo(key) if callbacks else None
+            for callback in callbacks:
+                callback(photo)
+        if self._pending:
+            self._poll_id = self.root.after(RESULT_POLL_MS, self._poll)
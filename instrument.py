@@ -0,0 +1,371 @@
+"""Opt-in instrumentation: queries, rows, time and connection opens per user action.
+
+Off unless LJFM_INSTRUMENT=1 is set when main.py starts (or enable() is
+called). Then every public database.py function, get_conn() included, and
+every public FragranceManagerApp method is wrapped, and each pooled
+connection gets a sqlite3 trace callback. Whatever runs on a thread while a
+handler is executing, including background jobs it queues on the
+TaskRunner, is charged to that handler as one "action".
+
+LJFM_PROFILE=path also runs cProfile on the Tk thread and writes the stats
+to path at exit. In the app, Ctrl+Shift+D opens the diagnostics window.
+"""
+import atexit
+import cProfile
+import functools
+import inspect
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+import database
+import tasks
+
+ROLLING_WINDOW = 500      # samples kept per action name
+RECENT_ACTIONS = 200
+HISTOGRAM_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+N_PLUS_ONE = 10           # one statement run this often in one action is flagged
+
+# database.py helpers that never touch the database
+NOT_WRAPPED = ("to_cents", "format_cents", "to_quantity", "to_size", "sale_key",
+               "storage_profile", "connection_open_count", "set_connection_hook", "write_version",
+               "customer_key", "customer_revenue_key")
+# Counted inside an action but never start one of their own
+PLUMBING = ("get_conn", "release_conn", "transaction")
+# App methods other code calls per row or per event (VirtualTable, the image
+# caches, TaskRunner's busy hook), as are format_*_row(); as actions they
+# would flood the samples with empty runs. Their work is still charged to
+# whatever action is running when they are called.
+HANDLER_SKIP = ("cached_source", "fragrance_image_path", "load_row_thumbnail", "show_viewer_image",
+                "set_busy")
+# App methods that re-arm themselves with root.after(). A tick runs as an
+# action that is thrown away, together with the jobs it queues, so the
+# recent list is not filled with timer noise; whatever they trigger later
+# (e.g. refresh_all_tables() after an outside write) is still recorded.
+TIMERS = ("poll_external_changes", "periodic_checkpoint")
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+
+enabled = False
+_lock = threading.Lock()
+_local = threading.local()
+_samples = {}             # action name -> deque of (ms, queries, rows, opens)
+_recent = deque(maxlen=RECENT_ACTIONS)
+_patched = []             # (owner, attribute, original) for disable()
+_profiler = None
+_profile_path = None
+
+# ---------------- ACTIONS ----------------
+class Action:
+    """Everything one handler call (and the jobs it queued) did."""
+
+    __slots__ = ("name", "kept", "started", "ms", "queries", "rows", "opens", "calls", "call_ms", "sql")
+
+    def __init__(self, name, kept=True):
+        self.name = name
+        self.kept = kept
+        self.started = time.time()
+        self.ms = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.opens = 0
+        self.calls = Counter()
+        self.call_ms = Counter()
+        self.sql = Counter()
+
+    def repeated(self):
+        """(sql, count) of statements run N_PLUS_ONE times or more."""
+        return [(sql, n) for sql, n in self.sql.most_common() if n >= N_PLUS_ONE]
+
+def current():
+    return getattr(_local, "action", None)
+
+@contextmanager
+def action(name, kept=True):
+    """Charge everything run on this thread inside the block to one action.
+
+    An action started inside another one folds into the outer action. With
+    kept=False the action is measured as usual but not recorded.
+    """
+    outer = current()
+    if outer is not None:
+        yield outer
+        return
+    act = _local.action = Action(name, kept)
+    start = time.perf_counter()
+    try:
+        yield act
+    finally:
+        act.ms = (time.perf_counter() - start) * 1000
+        _local.action = None
+        if act.kept:
+            _store(act)
+
+def record(name, ms):
+    """Add a timing measured elsewhere (e.g. time to first frame) as an action.
+
+    Does nothing unless recording is on.
+    """
+    if enabled:
+        act = Action(name)
+        act.ms = ms
+        _store(act)
+
+def _store(act):
+    with _lock:
+        samples = _samples.get(act.name)
+        if samples is None:
+            samples = _samples[act.name] = deque(maxlen=ROLLING_WINDOW)
+        samples.append((act.ms, act.queries, act.rows, act.opens))
+        _recent.append(act)
+
+def normalize_sql(statement):
+    """Statement text with literals replaced by ? and whitespace collapsed."""
+    return _SPACE.sub(" ", _LITERALS.sub("?", statement)).strip()
+
+# ---------------- HOOKS ----------------
+def _trace(statement):
+    act = current()
+    # "--" marks statements run by a trigger; they belong to the one that fired it
+    if act is None or statement.startswith("--"):
+        return
+    act.queries += 1
+    act.sql[normalize_sql(statement)] += 1
+
+def _on_connection(conn, new):
+    conn.set_trace_callback(_trace)
+    act = current()
+    if new and act is not None:
+        act.opens += 1
+
+def _row_count(result):
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, tuple):   # a single fetchone() row
+        return 1
+    return 0
+
+def _wrap_query(fn):
+    name = fn.__name__
+
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def generator(*args, **kwargs):
+            counted = False
+            for row in fn(*args, **kwargs):
+                act = current()
+                if act is not None:
+                    if not counted:
+                        act.calls[name] += 1
+                        counted = True
+                    act.rows += 1
+                yield row
+        return generator
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if current() is None and name not in PLUMBING:
+            with action(f"db:{name}"):
+                return wrapper(*args, **kwargs)
+        depth = getattr(_local, "depth", 0)
+        _local.depth = depth + 1
+        start = time.perf_counter()
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+            return result
+        finally:
+            _local.depth = depth
+            act = current()
+            if act is not None:
+                act.calls[name] += 1
+                act.call_ms[name] += (time.perf_counter() - start) * 1000
+                if depth == 0:
+                    # nested calls return rows the outer call already counts
+                    act.rows += _row_count(result)
+    return wrapper
+
+def _wrap_handler(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with action(fn.__name__):
+            return fn(*args, **kwargs)
+    return wrapper
+
+def _wrap_timer(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with action(fn.__name__, kept=False):
+            return fn(*args, **kwargs)
+    return wrapper
+
+def _wrap_submit(submit):
+    """Run queued jobs as a child action of the handler that queued them."""
+    @functools.wraps(submit)
+    def wrapper(self, fn, *args, **kwargs):
+        parent = current()
+        name = getattr(fn, "__name__", "job")
+        kept = parent is None or parent.kept
+        if parent is not None:
+            name = f"{parent.name} > {name}"
+
+        def job(*job_args, **job_kwargs):
+            with action(name, kept):
+                return fn(*job_args, **job_kwargs)
+        return submit(self, job, *args, **kwargs)
+    return wrapper
+
+def _is_handler(name):
+    if name.startswith("_") or name in HANDLER_SKIP:
+        return False
+    return not (name.startswith("format_") and name.endswith("_row"))
+
+def _patch(owner, attribute, value):
+    _patched.append((owner, attribute, getattr(owner, attribute)))
+    setattr(owner, attribute, value)
+
+def _app_modules():
+    """Loaded modules from this directory; they hold `from database import` copies."""
+    here = os.path.dirname(os.path.abspath(database.__file__))
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if path and os.path.dirname(os.path.abspath(path)) == here:
+            yield module
+
+# ---------------- ON / OFF ----------------
+def enable(*classes, profile=None):
+    """Start recording; each class's public methods become actions.
+
+    Call after the app modules are imported and before the app object is
+    created, so Tk bindings pick up the wrapped methods.
+    """
+    global enabled, _profiler, _profile_path
+    if enabled:
+        return
+    enabled = True
+    wrapped = {}
+    for name, fn in inspect.getmembers(database, inspect.isfunction):
+        if fn.__module__ == "database" and not name.startswith("_") and name not in NOT_WRAPPED:
+            wrapped[fn] = _wrap_query(fn)
+    for module in _app_modules():
+        for attribute, value in list(vars(module).items()):
+            if inspect.isfunction(value) and value in wrapped:
+                _patch(module, attribute, wrapped[value])
+    for cls in classes:
+        for name, fn in list(vars(cls).items()):
+            if inspect.isfunction(fn) and name in TIMERS:
+                _patch(cls, name, _wrap_timer(fn))
+            elif inspect.isfunction(fn) and _is_handler(name):
+                _patch(cls, name, _wrap_handler(fn))
+    for name in ("write", "read", "background"):
+        _patch(tasks.TaskRunner, name, _wrap_submit(getattr(tasks.TaskRunner, name)))
+    database.set_connection_hook(_on_connection)
+
+    if profile:
+        _profiler, _profile_path = cProfile.Profile(), profile
+        _profiler.enable()
+        atexit.register(dump_profile)
+
+def enable_from_env(*classes):
+    """enable() when LJFM_INSTRUMENT is set; returns whether recording is on."""
+    if os.environ.get("LJFM_INSTRUMENT", "0") not in ("", "0"):
+        enable(*classes, profile=os.environ.get("LJFM_PROFILE") or None)
+    return enabled
+
+def disable():
+    """Undo every wrapper and stop tracing; recorded data is kept."""
+    global enabled
+    if not enabled:
+        return
+    database.set_connection_hook(lambda conn, new: conn.set_trace_callback(None))
+    database.set_connection_hook(None)
+    while _patched:
+        owner, attribute, original = _patched.pop()
+        setattr(owner, attribute, original)
+    dump_profile()
+    enabled = False
+
+def profiling():
+    return _profiler is not None
+
+def dump_profile(path=None):
+    """Write the cProfile stats so far (pstats format); returns the path."""
+    if _profiler is None:
+        return None
+    path = path or _profile_path
+    _profiler.disable()
+    try:
+        _profiler.dump_stats(path)
+    finally:
+        _profiler.enable()
+    return path
+
+# ---------------- RESULTS ----------------
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def summary():
+    """One row per action name over its last ROLLING_WINDOW runs, slowest first.
+
+    Rows are (name, runs, p50_ms, p95_ms, max_ms, queries, rows, opens);
+    queries and rows are per run, opens is the total.
+    """
+    with _lock:
+        samples = {name: list(values) for name, values in _samples.items()}
+    rows = []
+    for name, values in samples.items():
+        ordered = sorted(v[0] for v in values)
+        runs = len(values)
+        rows.append((name, runs, _percentile(ordered, 0.5), _percentile(ordered, 0.95), ordered[-1],
+                     sum(v[1] for v in values) / runs, sum(v[2] for v in values) / runs,
+                     sum(v[3] for v in values)))
+    rows.sort(key=lambda row: row[3], reverse=True)
+    return rows
+
+def histogram(name):
+    """(upper bound in ms or None, count) buckets of the action's recent run times."""
+    with _lock:
+        times = [v[0] for v in _samples.get(name, ())]
+    counts = Counter()
+    for ms in times:
+        counts[next((bound for bound in HISTOGRAM_MS if ms <= bound), None)] += 1
+    return [(bound, counts[bound]) for bound in (*HISTOGRAM_MS, None)]
+
+def recent():
+    """Recorded actions, newest first."""
+    with _lock:
+        return list(reversed(_recent))
+
+def reset():
+    with _lock:
+        _samples.clear()
+        _recent.clear()
+
+def describe(act):
+    """Multi-line text report of one action."""
+    lines = [f"{act.name}: {act.ms:.1f} ms, {act.queries} queries, {act.rows} rows, "
+             f"{act.opens} connection opens",
+             "", "Calls:"]
+    for name, count in act.calls.most_common():
+        # generators are not timed: their rows arrive inside the caller's loop
+        ms = f"  ({act.call_ms[name]:.1f} ms)" if name in act.call_ms else ""
+        lines.append(f"  {count:6d}  {name}{ms}")
+    lines += ["", "SQL:"]
+    for sql, count in act.sql.most_common():
+        flag = "  <-- repeated" if count >= N_PLUS_ONE else ""
+        lines.append(f"  {count:6d}  {sql}{flag}")
+    return "\n".join(lines)
+
+def describe_histogram(name, width=40):
+    buckets = histogram(name)
+    most = max(count for _, count in buckets) or 1
+    lines = [f"{name}: last {sum(count for _, count in buckets)} runs"]
+    for bound, count in buckets:
+        label = f"<= {bound} ms" if bound is not None else f"> {HISTOGRAM_MS[-1]} ms"
+        lines.append(f"  {label:>11}  {'#' * round(width * count / most):<{width}}  {count}")
+    return "\n".join(lines)
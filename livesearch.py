@@ -0,0 +1,138 @@
+import queue
+import sqlite3
+import threading
+
+from database import get_conn, release_conn, search_fragrances, table_version
+
+SEARCH_DEBOUNCE_MS = 250
+RESULT_POLL_MS = 30
+
+# ---------------- LIVE SEARCH ----------------
+def fragrance_matches(f, query):
+    """Python twin of search_fragrances() for narrowing cached results."""
+    q = query.lower()
+    return q in (f[1] or "").lower() or q in (f[7] or "").lower() or q in (f[2] or "").lower()
+
+
+class LiveSearch:
+    """Debounced search-as-you-type over search_fragrances().
+
+    schedule() restarts a short timer on every keystroke; when it fires the
+    query is handed to a worker thread. Only the newest query matters: older
+    queued ones are dropped and one already running is interrupted. When the
+    new query contains the previous one, the previous result set is filtered
+    instead of hitting the database again. Results reach on_results on the
+    Tk thread through root.after() polling. A failed search calls
+    on_error(exc) there instead, once until a search succeeds again.
+    """
+
+    def __init__(self, root, on_results, on_error=None):
+        self.root = root
+        self.on_results = on_results
+        self.on_error = on_error
+        self._failing = False
+        self.query = None
+        self._generation = 0
+        self._running = None
+        self._timer = None
+        self._poll_id = None
+        self._cache = None
+        self._conn = None
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="live-search", daemon=True)
+        self._thread.start()
+
+    def schedule(self, query):
+        """Search for query after the debounce delay (no-op if unchanged)."""
+        if query == self.query:
+            return
+        self.query = query
+        if self._timer is not None:
+            self.root.after_cancel(self._timer)
+        self._timer = self.root.after(SEARCH_DEBOUNCE_MS, self.submit)
+
+    def submit(self, query=None):
+        """Search immediately, superseding anything pending."""
+        if query is not None:
+            self.query = query
+        if self._timer is not None:
+            self.root.after_cancel(self._timer)
+            self._timer = None
+        self._generation += 1
+        if self._running is not None and self._conn is not None:
+            self._conn.interrupt()
+        self._requests.put((self._generation, self.query))
+        if self._poll_id is None:
+            self._poll_id = self.root.after(RESULT_POLL_MS, self._poll)
+
+    def cancel(self):
+        """Drop the pending query, e.g. when the search box is cleared."""
+        self.query = None
+        self._generation += 1
+        if self._timer is not None:
+            self.root.after_cancel(self._timer)
+            self._timer = None
+
+    def close(self):
+        self.cancel()
+        self._requests.put(None)
+
+    # ---------------- WORKER THREAD ----------------
+    def _run(self):
+        self._conn = get_conn()
+        while True:
+            item = self._requests.get()
+            if item is None:
+                break
+            generation, query = item
+            if generation != self._generation:
+                continue
+            self._running = generation
+            try:
+                results = self._execute(query)
+            except sqlite3.OperationalError as e:
+                if str(e) == "interrupted":
+                    # Interrupted by a newer query; if the interrupt landed
+                    # on the newest one instead, run it again.
+                    if generation == self._generation:
+                        self._requests.put(item)
+                    continue
+                results = e
+            except sqlite3.Error as e:
+                results = e
+            finally:
+                self._running = None
+            self._results.put((generation, results))
+        release_conn()
+
+    def _execute(self, query):
+        version = table_version("fragrances")
+        cache = self._cache
+        if cache and cache[0] == version and cache[1].lower() in query.lower():
+            results = [f for f in cache[2] if fragrance_matches(f, query)]
+        else:
+            results = search_fragrances(query)
+        self._cache = (version, query, results)
+        return results
+
+    # ---------------- TK THREAD ----------------
+    def _poll(self):
+        self._poll_id = None
+        latest = None
+        while True:
+            try:
+                generation, results = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if generation == self._generation:
+                latest = results
+        if isinstance(latest, Exception):
+            if not self._failing and self.on_error:
+                self.on_error(latest)
+            self._failing = True
+        elif latest is not None:
+            self._failing = False
+            self.on_results(latest)
+        elif self.query is not None:
+            self._poll_id = self.root.after(RESULT_POLL_MS, self._poll)
@@ -0,0 +1,159 @@
+"""Headless command line for LJ Fragrances Manager.
+
+    python -m ljfm stock [--low] [--list] [--gender GENDER]
+    python -m ljfm sales [--from DATE] [--to DATE] [--fragrance NAME] [--customer ID] [--limit N]
+    python -m ljfm export TABLE FILE [--format csv|jsonl]
+    python -m ljfm import TABLE FILE [--format csv|jsonl]
+    python -m ljfm report [--period day|week|month] [--by total|fragrance|customer|gender] [--from DATE] [--to DATE]
+
+FILE may be "-" for stdout/stdin. --db and --profile select the database
+file and storage profile. Only database.py is imported up front; nothing
+pulls in Tk or PIL, so the CLI runs without a display.
+"""
+import argparse
+import sys
+
+TABLES = ("fragrances", "customers", "sales", "supplies", "oils")
+
+# ---------------- OUTPUT ----------------
+def _print_rows(header, rows):
+    """Tab-separated output, header first, streamed row by row."""
+    print("\t".join(header))
+    for row in rows:
+        print("\t".join("" if v is None else str(v) for v in row))
+
+def _progress(action):
+    return lambda count: print(f"{action} {count} rows", file=sys.stderr)
+
+# ---------------- COMMANDS ----------------
+def cmd_stock(args):
+    import database
+
+    if args.low:
+        _print_rows(("id", "name", "gender", "quantity", "unit_cost", "sale_price"),
+                    ((f[0], f[1], f[3], f[8], database.format_cents(f[5]), database.format_cents(f[6]))
+                     for f in database.get_low_stock_fragrances()
+                     if args.gender is None or f[3] == args.gender))
+    elif args.list:
+        columns = database.BULK_COLUMNS["fragrances"]
+        gender = columns.index("gender")
+        _print_rows(columns, (row for row in database.export_rows("fragrances")
+                              if args.gender is None or row[gender] == args.gender))
+    else:
+        fmt = database.format_cents
+        rows = [(g or "-", skus, units, fmt(cost), fmt(retail), low)
+                for g, skus, units, cost, retail, low in database.get_inventory_summary()
+                if args.gender is None or g == args.gender]
+        if args.gender is None:
+            skus, units, cost, retail, low = database.get_inventory_totals()
+            rows.append(("TOTAL", skus, units, fmt(cost), fmt(retail), low))
+        _print_rows(("gender", "fragrances", "units", "total_cost", "retail_value", "low_stock"), rows)
+    return 0
+
+def cmd_sales(args):
+    import database
+
+    filters = {"start": args.start, "end": args.end, "customer_id": args.customer}
+    if args.fragrance:
+        fragrance = database.get_fragrance_by_name(args.fragrance)
+        if fragrance is None:
+            raise ValueError(f"Unknown fragrance: {args.fragrance!r}")
+        filters["fragrance_id"] = fragrance[0]
+    fmt = database.format_cents
+    _print_rows(("id", "fragrance", "customer", "qty", "unit_cost", "sale_price", "revenue", "profit", "date"),
+                ((s[0], s[1], s[2], s[3], fmt(s[4]), fmt(s[5]), fmt(s[6]), fmt(s[7]), s[8])
+                 for s in database.iter_sales(limit=args.limit, **filters)))
+    return 0
+
+def cmd_export(args):
+    import bulkio
+
+    target = sys.stdout if args.file == "-" else args.file
+    fmt = args.format or ("csv" if args.file == "-" else None)
+    bulkio.export_table(args.table, target, fmt, progress=None if args.file == "-" else _progress("Exported"))
+    return 0
+
+def cmd_import(args):
+    import bulkio
+
+    source = sys.stdin if args.file == "-" else args.file
+    fmt = args.format or ("csv" if args.file == "-" else None)
+    count = bulkio.import_table(args.table, source, fmt, progress=_progress("Imported"))
+    print(f"Imported {count} {args.table} rows", file=sys.stderr)
+    return 0
+
+def cmd_report(args):
+    import database
+    import reports
+
+    rows = reports.sales_report(args.period, args.by, args.start, args.end)
+    fmt = database.format_cents
+    out = [(period, label, units, fmt(revenue), fmt(profit), count)
+           for period, _, label, units, revenue, profit, count in rows]
+    units, revenue, profit, count = reports.report_totals(rows)
+    out.append(("TOTAL", "", units, fmt(revenue), fmt(profit), count))
+    _print_rows(("period", args.by, "units", "revenue", "profit", "sales"), out)
+    return 0
+
+# ---------------- ARGUMENTS ----------------
+def build_parser():
+    parser = argparse.ArgumentParser(prog="ljfm", description="LJ Fragrances Manager (command line)")
+    parser.add_argument("--db", help="database file (default: fragrances.db)")
+    parser.add_argument("--profile", choices=("fast", "durable"), help="SQLite storage profile")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stock = commands.add_parser("stock", help="inventory summary, stock list or low-stock report")
+    stock.add_argument("--low", action="store_true", help="list low-stock fragrances")
+    stock.add_argument("--list", action="store_true", help="list every fragrance")
+    stock.add_argument("--gender", help="only this gender")
+    stock.set_defaults(run=cmd_stock)
+
+    sales = commands.add_parser("sales", help="sales history, oldest first")
+    sales.add_argument("--from", dest="start", help="first date, YYYY-MM-DD")
+    sales.add_argument("--to", dest="end", help="end date (exclusive), YYYY-MM-DD")
+    sales.add_argument("--fragrance", help="fragrance name")
+    sales.add_argument("--customer", type=int, help="customer id")
+    sales.add_argument("--limit", type=int, help="at most this many sales")
+    sales.set_defaults(run=cmd_sales)
+
+    for name, run, help_text in (("export", cmd_export, "write a table to CSV or JSON Lines"),
+                                 ("import", cmd_import, "upsert a table from CSV or JSON Lines")):
+        sub = commands.add_parser(name, help=help_text)
+        sub.add_argument("table", choices=TABLES)
+        sub.add_argument("file", help='path, or "-" for stdout/stdin')
+        sub.add_argument("--format", choices=("csv", "jsonl"), help="default: from the file extension")
+        sub.set_defaults(run=run)
+
+    report = commands.add_parser("report", help="units, revenue and profit per period")
+    report.add_argument("--period", choices=("day", "week", "month"), default="month")
+    report.add_argument("--by", choices=("total", "fragrance", "customer", "gender"), default="total")
+    report.add_argument("--from", dest="start", help="first date, YYYY-MM-DD")
+    report.add_argument("--to", dest="end", help="end date (exclusive), YYYY-MM-DD")
+    report.set_defaults(run=cmd_report)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    import sqlite3
+    import database
+
+    try:
+        if args.db:
+            database.set_db_path(args.db)
+        if args.profile:
+            database.set_storage_profile(args.profile)
+        for note in database.init_db():
+            print(f"ljfm: upgrade: {note}", file=sys.stderr)
+        return args.run(args)
+    except BrokenPipeError:
+        # e.g. piped into head
+        return 0
+    except (ValueError, OSError, sqlite3.Error) as e:
+        print(f"ljfm: error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        database.shutdown()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,37 +2,157 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from PIL import Image, ImageTk
 import os
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 from database import *
+from tableview import KeysetPager, VirtualTable
+from livesearch import LiveSearch
+from picker import TypeAheadPicker
+from images import ImageCache, store_image, thumbnail_path
+from reports import GRAINS, DIMENSIONS, sales_report, report_totals
+from bulkio import TABLES, export_table, import_table
+from tasks import TaskRunner
+import instrument
+import repository
 
 # ---------------- CONSTANTS ----------------
+STARTED = time.perf_counter()  # time to first frame counts from here; imports: python -X importtime
 UNIT_COST = 5.0
 SALE_PRICE = 25.0
 IMAGE_DIR = "assets/images/" 
 VIEWER_IMAGE_SIZE = (180, 180) 
+ROW_THUMB_SIZE = (50, 50)
+THUMB_CACHE_BYTES = 8 * 1024 * 1024
+CHECKPOINT_INTERVAL_MS = 5 * 60 * 1000
+EXTERNAL_CHANGES_POLL_MS = 2000
+CUSTOMER_SEARCH_DEBOUNCE_MS = 200
+CUSTOMER_SORTS = {"Name": "name", "Top spenders": "revenue"}
+CUSTOMER_SEGMENT_LABELS = {"All": "all", "Repeat buyers": "repeat", "One-time buyers": "one-time",
+                           "No purchases": "none", f"Lapsed ({LAPSED_DAYS}+ days)": "lapsed"}
+PREFETCH_RADIUS = 2
+DATA_FILETYPES = [("CSV files", "*.csv"), ("JSON Lines", "*.jsonl"), ("All files", "*.*")]
 LOGO_PATH = "assets/logo.png"
 
 # ---------------- APP CLASS ----------------
 class FragranceManagerApp:
     def __init__(self, root):
-        self.root = root
+        self._init_state(root)
         self.root.title("LJ Fragrances Manager")
         self.root.geometry("1600x900")
+
+        upgrade_notes = init_db()
+        self.prefill_defaults()
+        self.tasks = TaskRunner(root, on_error=self.task_error, on_busy=self.set_busy)
+        # Record the starting data_version, so the first timed poll only reacts
+        # to writes made by other processes after startup
+        self.tasks.background(repository.poll_external_changes)
+        self.import_legacy_images()
+        self.setup_ui()
+
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(CHECKPOINT_INTERVAL_MS, self.periodic_checkpoint)
+        self.root.after(EXTERNAL_CHANGES_POLL_MS, self.poll_external_changes)
+        self.root.after_idle(self.report_first_frame)
+        if upgrade_notes:
+            self.root.after_idle(self.show_upgrade_notes, upgrade_notes)
+
+    def _init_state(self, root):
+        """Set every attribute the app keeps, before any window or database work."""
+        self.root = root
         self.selected_id = None
         self.selected_customer_id = None
         self.selected_supply_id = None
         self.selected_oil_id = None
-        self.image_cache = {}
+        self.image_cache = ImageCache(root)
+        self.thumb_cache = ImageCache(root, max_bytes=THUMB_CACHE_BYTES)
         self.selected_image_path = None
         self.current_fragrance_image = None
         self.logo_photo = None
-        
-        init_db() 
-
-        self.setup_ui()
-        self.prefill_fragrances()
-        self.prefill_supplies()
-        self.prefill_oils()
+        self.tables = {}
+        self.dashboard_version = None
+        self.sales_filters = {}
+        self.customer_filters = ("", "name", "all")   # (search text, sort, segment)
+        self.customer_search_timer = None
+        self.customer_summary_key = None
+        self.first_frame_ms = None
+        self.change_check_failing = False
+        # Trees exist once their tab has been shown for the first time
+        self.men_tree = self.women_tree = self.unisex_tree = None
+        self.customer_tree = self.sales_tree = self.supplies_tree = self.oils_tree = None
+        self.customer_history_tree = None
+
+    def report_first_frame(self):
+        """Record how long startup took to get the first frame drawn.
+
+        Kept in first_frame_ms; with instrumentation on it is also listed
+        in the diagnostics window as the "first_frame" action.
+        """
+        self.root.update_idletasks()
+        self.first_frame_ms = (time.perf_counter() - STARTED) * 1000
+        instrument.record("first_frame", self.first_frame_ms)
+
+    def show_upgrade_notes(self, notes):
+        """Tell the user what upgrading the database changed (also kept in upgrade_log)."""
+        messagebox.showwarning("Database Upgraded",
+                               "Some old records had to be changed or set aside:\n\n" + "\n".join(notes))
+
+    def periodic_checkpoint(self):
+        """Fold the WAL back into the database while the app is idle."""
+        self.tasks.background(checkpoint, on_error=lambda e: print(f"Checkpoint failed: {e}"))
+        self.root.after(CHECKPOINT_INTERVAL_MS, self.periodic_checkpoint)
+
+    def poll_external_changes(self):
+        """Reload cached data when another process (e.g. ljfm import) wrote to the database."""
+        def done(changed):
+            self.change_check_failing = False
+            if changed:
+                self.refresh_all_tables()
+
+        def failed(e):
+            # Reported once per outage, not on every poll
+            if not self.change_check_failing:
+                self.change_check_failing = True
+                self.task_error(e)
+        self.tasks.background(repository.poll_external_changes, on_done=done, on_error=failed)
+        self.root.after(EXTERNAL_CHANGES_POLL_MS, self.poll_external_changes)
+
+    # ---------------- BACKGROUND TASKS ----------------
+    # Writes run on the TaskRunner's writer thread in submission order; the
+    # UI is updated from their on_done callbacks, back on the Tk thread.
+    def set_busy(self, pending):
+        self.busy_label.config(text="⏳ Working..." if pending else "")
+        self.root.config(cursor="watch" if pending else "")
+
+    def task_error(self, e, parent=None):
+        if parent is None or not parent.winfo_exists():
+            parent = self.root
+        title = "Invalid Input" if isinstance(e, ValueError) else "Error"
+        messagebox.showerror(title, str(e), parent=parent)
+
+    def submit_form(self, form, button, fn, *args, on_done=None):
+        """Run a form's write in the background; the form closes once it succeeds."""
+        button.config(state="disabled")
+
+        def done(result):
+            if on_done:
+                on_done(result)
+            if form.winfo_exists():
+                form.destroy()
+
+        def failed(e):
+            if form.winfo_exists():
+                button.config(state="normal")
+            self.task_error(e, form)
+
+        self.tasks.write(fn, *args, on_done=done, on_error=failed)
+
+    def on_close(self):
+        self.tasks.close()
+        self.live_search.close()
+        self.image_cache.close()
+        self.thumb_cache.close()
+        shutdown()
+        self.root.destroy()
 
     # ---------------- UI SETUP ----------------
     def setup_ui(self):
@@ -40,7 +160,27 @@ class FragranceManagerApp:
         style = ttk.Style()
         style.configure('Modern.TButton', font=('Arial', 10, 'bold'), padding=5)
         style.configure('Bold.TLabel', font=('Arial', 10, 'bold'))
-        
+        style.configure('Thumb.Treeview', rowheight=ROW_THUMB_SIZE[1] + 4)
+
+        # File menu: bulk export / import per table
+        menubar = tk.Menu(self.root)
+        file_menu = tk.Menu(menubar, tearoff=0)
+        export_menu = tk.Menu(file_menu, tearoff=0)
+        import_menu = tk.Menu(file_menu, tearoff=0)
+        for table in TABLES:
+            export_menu.add_command(label=table.capitalize(), command=lambda t=table: self.export_data(t))
+            import_menu.add_command(label=table.capitalize(), command=lambda t=table: self.import_data(t))
+        file_menu.add_cascade(label="Export", menu=export_menu)
+        file_menu.add_cascade(label="Import", menu=import_menu)
+        file_menu.add_separator()
+        file_menu.add_command(label="Exit", command=self.on_close)
+        menubar.add_cascade(label="File", menu=file_menu)
+        self.root.config(menu=menubar)
+        if instrument.enabled:
+            # deliberately not on the menu
+            for sequence in ("<Control-Shift-D>", "<Control-Shift-d>"):
+                self.root.bind(sequence, lambda e: self.open_diagnostics())
+
         # Main Layout: Top frame for image/details, Bottom for tabs
         main_frame = ttk.Frame(self.root)
         main_frame.pack(expand=True, fill="both", padx=10, pady=10)
@@ -62,8 +202,20 @@ class FragranceManagerApp:
         ttk.Label(search_frame, text="Search Fragrance:", font=('Arial', 10, 'bold')).pack(side="left", padx=5)
         self.search_entry = ttk.Entry(search_frame, width=30)
         self.search_entry.pack(side="left", padx=5)
+        self.search_entry.bind("<KeyRelease>", self.on_search_key)
+        self.search_entry.bind("<Return>", lambda e: self.search_fragrance())
+        self.live_search = LiveSearch(self.root, self.show_search_results, on_error=self.task_error)
         ttk.Button(search_frame, text="Search", command=self.search_fragrance).pack(side="left", padx=5)
-        ttk.Button(search_frame, text="Clear", command=self.refresh_all_tables).pack(side="left", padx=5)
+        ttk.Button(search_frame, text="Clear", command=self.clear_search).pack(side="left", padx=5)
+        self.busy_label = ttk.Label(search_frame, style='Bold.TLabel')
+        self.busy_label.pack(side="left", padx=10)
+
+        # Inventory dashboard, read from the trigger-maintained summary table
+        dashboard_frame = ttk.Frame(search_container)
+        dashboard_frame.pack(side="top", anchor="w", pady=(10, 0))
+        self.dashboard_label = ttk.Label(dashboard_frame, justify=tk.LEFT)
+        self.dashboard_label.pack(side="left", padx=5)
+        ttk.Button(dashboard_frame, text="⚠️ Low Stock Report", command=self.low_stock_report).pack(side="left", padx=5)
 
         # RIGHT SIDE: Image Viewer
         self.image_viewer_frame = ttk.LabelFrame(top_frame, text="Fragrance Details", padding="10")
@@ -95,15 +247,28 @@ class FragranceManagerApp:
         self.tabControl.add(self.sales_tab, text="Sales")
         self.tabControl.add(self.supplies_tab, text="Supplies")
         self.tabControl.add(self.oils_tab, text="Oils")
-        
-        self.setup_fragrance_tab(self.men_tab, "Men")
-        self.setup_fragrance_tab(self.women_tab, "Women")
-        self.setup_fragrance_tab(self.unisex_tab, "Unisex")
-        
-        self.setup_customer_tab(self.customer_tab)
-        self.setup_sales_tab(self.sales_tab)
-        self.setup_supplies_tab(self.supplies_tab)
-        self.setup_oils_tab(self.oils_tab)
+
+        # Tabs are built, and their tables first queried, when first shown
+        self.tab_builders = {
+            str(self.men_tab): lambda: self.setup_fragrance_tab(self.men_tab, "Men"),
+            str(self.women_tab): lambda: self.setup_fragrance_tab(self.women_tab, "Women"),
+            str(self.unisex_tab): lambda: self.setup_fragrance_tab(self.unisex_tab, "Unisex"),
+            str(self.customer_tab): lambda: self.setup_customer_tab(self.customer_tab),
+            str(self.sales_tab): lambda: self.setup_sales_tab(self.sales_tab),
+            str(self.supplies_tab): lambda: self.setup_supplies_tab(self.supplies_tab),
+            str(self.oils_tab): lambda: self.setup_oils_tab(self.oils_tab),
+        }
+        self.tabControl.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        self.build_tab(self.tabControl.select())
+        self.update_dashboard()
+
+    def on_tab_changed(self, event):
+        self.build_tab(self.tabControl.select())
+
+    def build_tab(self, tab_id):
+        builder = self.tab_builders.pop(str(tab_id), None)
+        if builder:
+            builder()
 
     def load_logo(self, parent_frame):
         """Loads and places the logo image."""
@@ -127,11 +292,12 @@ class FragranceManagerApp:
         table_frame = ttk.Frame(parent)
         table_frame.pack(fill="both", expand=True, padx=5, pady=5)
         
-        # Table setup (REMOVED: show="tree headings" and the #0 column configuration)
+        # Table setup: "#0" holds a thumbnail, loaded lazily for visible rows only
         columns = ("Name", "Inspired By", "Unit Cost", "Sale Price", "Quantity", "Total Cost", "Retail Value", "Gender")
-        tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=20) # Changed show="tree headings" to show="headings"
+        tree = ttk.Treeview(table_frame, columns=columns, show="tree headings", height=20, style='Thumb.Treeview')
 
-        # No tree.heading("#0", ...) or tree.column("#0", ...) needed anymore
+        tree.heading("#0", text="")
+        tree.column("#0", width=ROW_THUMB_SIZE[0] + 10, stretch=False, anchor="center")
 
         for col in columns:
             tree.heading(col, text=col)
@@ -140,12 +306,16 @@ class FragranceManagerApp:
         tree.pack(side="left", fill="both", expand=True)
         setattr(self, f"{gender.lower()}_tree", tree)
 
-        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
-        tree.configure(yscroll=scrollbar.set)
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical")
         scrollbar.pack(side="right", fill="y")
+        self.tables[tree] = VirtualTable(tree, scrollbar, self.format_fragrance_row,
+                                         version=lambda: repository.version("fragrances"),
+                                         row_image=lambda f: self.fragrance_image_path(f, ROW_THUMB_SIZE),
+                                         load_image=lambda iid, path: self.load_row_thumbnail(tree, iid, path))
+        tree.tag_configure("low_stock", background="red")
 
-        tree.bind("<<TreeviewSelect>>", self.on_fragrance_select)
-        self.populate_table(tree, gender)
+        tree.bind("<<TreeviewSelect>>", self.on_fragrance_select, add="+")
+        self.populate_table(tree, gender, self.live_search.query)
 
         # 2. Tab-Specific Buttons
         btn_frame = ttk.Frame(parent)
@@ -155,22 +325,63 @@ class FragranceManagerApp:
         ttk.Button(btn_frame, text="✏️ Edit Fragrance", command=self.edit_fragrance, style='Modern.TButton').pack(side="left", padx=5)
         ttk.Button(btn_frame, text="🗑️ Delete Fragrance", command=self.delete_fragrance, style='Modern.TButton').pack(side="left", padx=5)
         ttk.Button(btn_frame, text="💵 Record Sale", command=self.record_sale, style='Modern.TButton').pack(side="right", padx=5)
+        ttk.Button(btn_frame, text="🧺 Basket Sale", command=self.basket_sale, style='Modern.TButton').pack(side="right", padx=5)
 
     def setup_customer_tab(self, parent):
+        search_frame = ttk.Frame(parent)
+        search_frame.pack(fill="x", padx=5, pady=(5, 0))
+        ttk.Label(search_frame, text="Search (name, email, phone, city):").pack(side="left", padx=5)
+        self.customer_search_entry = ttk.Entry(search_frame, width=30)
+        self.customer_search_entry.pack(side="left")
+        self.customer_search_entry.bind("<KeyRelease>", self.on_customer_search_key)
+        ttk.Label(search_frame, text="Sort:").pack(side="left", padx=5)
+        self.customer_sort_var = tk.StringVar(value="Name")
+        self.customer_sort_box = ttk.Combobox(search_frame, values=tuple(CUSTOMER_SORTS),
+                                              textvariable=self.customer_sort_var, state="readonly", width=12)
+        self.customer_sort_box.pack(side="left")
+        self.customer_sort_box.bind("<<ComboboxSelected>>", lambda e: self.apply_customer_search())
+        ttk.Label(search_frame, text="Show:").pack(side="left", padx=5)
+        self.customer_segment_var = tk.StringVar(value="All")
+        segment_box = ttk.Combobox(search_frame, values=tuple(CUSTOMER_SEGMENT_LABELS),
+                                   textvariable=self.customer_segment_var, state="readonly", width=16)
+        segment_box.pack(side="left")
+        segment_box.bind("<<ComboboxSelected>>", lambda e: self.apply_customer_search())
+        ttk.Button(search_frame, text="Clear", command=self.clear_customer_search).pack(side="left", padx=5)
+
         table_frame = ttk.Frame(parent)
         table_frame.pack(fill="both", expand=True, padx=5, pady=5)
 
-        columns = ("ID", "Name", "Email", "Phone", "City", "Reference")
+        columns = ("ID", "Name", "Email", "Phone", "City", "Reference", "Orders", "Revenue", "Profit", "Last Purchase")
         tree = ttk.Treeview(table_frame, columns=columns, show="headings")
         for col in columns:
             tree.heading(col, text=col)
-            tree.column(col, width=150)
+            tree.column(col, width=120)
         tree.pack(side="left", fill="both", expand=True)
         self.customer_tree = tree
-        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
-        tree.configure(yscroll=scrollbar.set)
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical")
         scrollbar.pack(side="right", fill="y")
-        tree.bind("<<TreeviewSelect>>", self.on_customer_select)
+        # Rollup columns change with every sale, so this reads SQLite, not the repository cache
+        self.tables[tree] = VirtualTable(tree, scrollbar, self.format_customer_row,
+                                         version=lambda: table_version("customers", "sales"))
+        tree.bind("<<TreeviewSelect>>", self.on_customer_select, add="+")
+
+        history_frame = ttk.LabelFrame(parent, text="Purchase History", padding="5")
+        history_frame.pack(fill="x", padx=5, pady=5)
+        self.customer_summary_label = ttk.Label(history_frame, style='Bold.TLabel')
+        self.customer_summary_label.pack(anchor="w", pady=(0, 5))
+        history_table = ttk.Frame(history_frame)
+        history_table.pack(fill="x")
+        columns = ("ID", "Date", "Fragrance", "Qty Sold", "Revenue", "Profit")
+        tree = ttk.Treeview(history_table, columns=columns, show="headings", height=8)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=120)
+        tree.pack(side="left", fill="both", expand=True)
+        self.customer_history_tree = tree
+        scrollbar = ttk.Scrollbar(history_table, orient="vertical")
+        scrollbar.pack(side="right", fill="y")
+        self.tables[tree] = VirtualTable(tree, scrollbar, self.format_history_row,
+                                         version=lambda: table_version("sales", "fragrances"))
         self.populate_customers()
 
         btn_frame = ttk.Frame(parent)
@@ -180,6 +391,21 @@ class FragranceManagerApp:
         ttk.Button(btn_frame, text="🗑️ Delete Customer", command=self.delete_customer, style='Modern.TButton').pack(side="left", padx=5)
 
     def setup_sales_tab(self, parent):
+        filter_frame = ttk.Frame(parent)
+        filter_frame.pack(fill="x", padx=5, pady=(5, 0))
+        ttk.Label(filter_frame, text="From (YYYY-MM-DD):").pack(side="left", padx=5)
+        self.sales_from_entry = ttk.Entry(filter_frame, width=11)
+        self.sales_from_entry.pack(side="left")
+        ttk.Label(filter_frame, text="To:").pack(side="left", padx=5)
+        self.sales_to_entry = ttk.Entry(filter_frame, width=11)
+        self.sales_to_entry.pack(side="left")
+        self.sales_fragrance_var = tk.BooleanVar()
+        ttk.Checkbutton(filter_frame, text="Selected fragrance", variable=self.sales_fragrance_var).pack(side="left", padx=5)
+        self.sales_customer_var = tk.BooleanVar()
+        ttk.Checkbutton(filter_frame, text="Selected customer", variable=self.sales_customer_var).pack(side="left", padx=5)
+        ttk.Button(filter_frame, text="Filter", command=self.apply_sales_filter).pack(side="left", padx=5)
+        ttk.Button(filter_frame, text="Clear", command=self.clear_sales_filter).pack(side="left", padx=5)
+
         table_frame = ttk.Frame(parent)
         table_frame.pack(fill="both", expand=True, padx=5, pady=5)
 
@@ -189,12 +415,17 @@ class FragranceManagerApp:
             tree.heading(col, text=col)
             tree.column(col, width=120)
         tree.pack(side="left", fill="both", expand=True)
-        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
-        tree.configure(yscroll=scrollbar.set)
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical")
         scrollbar.pack(side="right", fill="y")
         self.sales_tree = tree
+        self.tables[tree] = VirtualTable(tree, scrollbar, self.format_sale_row,
+                                         version=lambda: table_version("sales", "fragrances", "customers"))
         self.populate_sales()
-        
+
+        btn_frame = ttk.Frame(parent)
+        btn_frame.pack(fill="x", pady=5, padx=5)
+        ttk.Button(btn_frame, text="📊 Reports", command=self.open_sales_report, style='Modern.TButton').pack(side="left", padx=5)
+
 
     def setup_supplies_tab(self, parent):
         table_frame = ttk.Frame(parent)
@@ -206,11 +437,12 @@ class FragranceManagerApp:
             tree.heading(col, text=col)
             tree.column(col, width=150)
         tree.pack(side="left", fill="both", expand=True)
-        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
-        tree.configure(yscroll=scrollbar.set)
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical")
         scrollbar.pack(side="right", fill="y")
         self.supplies_tree = tree
-        tree.bind("<<TreeviewSelect>>", self.on_supply_select)
+        self.tables[tree] = VirtualTable(tree, scrollbar, self.format_supply_row, *self.cached_source(repository.supplies),
+                                         version=lambda: repository.version("supplies"))
+        tree.bind("<<TreeviewSelect>>", self.on_supply_select, add="+")
         self.populate_supplies()
         
         btn_frame = ttk.Frame(parent)
@@ -229,11 +461,12 @@ class FragranceManagerApp:
             tree.heading(col, text=col)
             tree.column(col, width=120)
         tree.pack(side="left", fill="both", expand=True)
-        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
-        tree.configure(yscroll=scrollbar.set)
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical")
         scrollbar.pack(side="right", fill="y")
         self.oils_tree = tree
-        tree.bind("<<TreeviewSelect>>", self.on_oil_select)
+        self.tables[tree] = VirtualTable(tree, scrollbar, self.format_oil_row, *self.cached_source(repository.oils),
+                                         version=lambda: repository.version("oils"))
+        tree.bind("<<TreeviewSelect>>", self.on_oil_select, add="+")
         self.populate_oils()
 
         btn_frame = ttk.Frame(parent)
@@ -243,114 +476,214 @@ class FragranceManagerApp:
         ttk.Button(btn_frame, text="🗑️ Delete Oil", command=self.delete_oil, style='Modern.TButton').pack(side="left", padx=5)
         
     # ---------------- POPULATE (FIX APPLIED HERE) ----------------
-    def populate_table(self, tree, gender, query=None):
-        for row in tree.get_children():
-            tree.delete(row)
-        fragrances = get_all_fragrances_by_gender(gender)
-        for f in fragrances:
-            if query:
-                q = query.lower()
-                if q not in (f[1] or "").lower() and q not in (f[7] or "").lower():
-                    continue
-            try:
-                unit_cost = float(f[5])
-                sale_price = float(f[6])
-                quantity = int(f[8])
-            except:
-                unit_cost = 0.0
-                sale_price = 0.0
-                quantity = 0
-            total_cost = unit_cost * quantity
-            retail_value = sale_price * quantity
-
-            # REMOVED thumbnail generation logic, but kept image check for selection logic (though no longer used in tree)
-            # photo = None
-            # if f[9] and os.path.exists(f[9]):
-            #     try:
-            #         img = Image.open(f[9]).resize((50,50))
-            #         photo = ImageTk.PhotoImage(img)
-            #         self.image_cache[str(f[0])] = photo
-            #     except:
-            #         photo = None
-
-            tags = ()
-            if quantity < 5:
-                tags = ("low_stock",)
-            
-            tree.insert("", "end",
-                        iid=str(f[0]),
-                        # REMOVED image=photo if photo else ""
-                        values=(str(f[1] or ""),
-                                str(f[7] or ""),
-                                f"{unit_cost:.2f}",
-                                f"{sale_price:.2f}",
-                                str(quantity),
-                                f"{total_cost:.2f}",
-                                f"{retail_value:.2f}",
-                                str(f[3] or "")
-                                ),
-                        tags=tags)
-        tree.tag_configure("low_stock", background="red")
+    # Tables are VirtualTables: populate_* only re-reads the row count and the
+    # visible window, the rest is paged in while scrolling. Catalogue tables
+    # page through the repository cache, sales and searches through SQLite.
+    # Tables whose data version has not changed are skipped, and changed
+    # ones only touch the rows that differ.
+    def cached_source(self, rows):
+        """(fetch, count) for a VirtualTable over a repository list."""
+        return (lambda offset, limit: rows()[offset:offset + limit]), (lambda: len(rows()))
 
+    def populate_table(self, tree, gender, query=None):
+        if tree is None:
+            return
+        if query:
+            fetch, count = (lambda offset, limit: get_fragrances_page(gender, offset, limit, query),
+                            lambda: count_fragrances_by_gender(gender, query))
+        else:
+            fetch, count = self.cached_source(lambda: repository.fragrances(gender))
+        self.tables[tree].set_source(fetch, count, key=(gender, query))
+
+    def format_fragrance_row(self, f):
+        # Prices are integer cents and quantities integers (CHECK constraints
+        # in the schema), so no parsing or error handling is needed here.
+        unit_cost, sale_price, quantity = f[5], f[6], f[8]
+
+        tags = ()
+        if quantity < LOW_STOCK_THRESHOLD:
+            tags = ("low_stock",)
+
+        values = (str(f[1] or ""),
+                  str(f[7] or ""),
+                  format_cents(unit_cost),
+                  format_cents(sale_price),
+                  str(quantity),
+                  format_cents(unit_cost * quantity),
+                  format_cents(sale_price * quantity),
+                  str(f[3] or ""))
+        return str(f[0]), values, tags
+
+    def load_row_thumbnail(self, tree, iid, path):
+        photo = self.thumb_cache.get(path, ROW_THUMB_SIZE)
+        if photo is None:
+            self.thumb_cache.request(path, ROW_THUMB_SIZE,
+                                     lambda photo: self.tables[tree].set_row_image(iid, path, photo))
+        return photo
+
+    def format_plain_row(self, row):
+        return str(row[0]), row, ()
+
+    def format_sale_row(self, s):
+        sid, fragrance, customer, qty, unit_cost, sale_price, revenue, profit, date = s
+        return str(sid), (sid, fragrance, customer, qty, format_cents(unit_cost), format_cents(sale_price),
+                          format_cents(revenue), format_cents(profit), date), ()
+
+    def format_supply_row(self, s):
+        return str(s[0]), (s[0], s[1], format_cents(s[2]), s[3], s[4]), ()
+
+    def format_oil_row(self, o):
+        return str(o[0]), (o[0], o[1], o[2], format_cents(o[3]), o[4], o[5]), ()
+
+    def format_customer_row(self, c):
+        cid, name, email, phone, city, reference, orders, revenue, profit, last_purchase = c
+        return str(cid), (cid, name, email or "", phone or "", city or "", reference or "", orders,
+                          format_cents(revenue), format_cents(profit), last_purchase or ""), ()
+
+    def format_history_row(self, s):
+        sid, fragrance, _, qty, _, _, revenue, profit, date = s
+        return str(sid), (sid, date, fragrance, qty, format_cents(revenue), format_cents(profit)), ()
+
+    # Customers are keyset-paginated by name (or revenue for "Top spenders")
+    # over the prefix indexes; the rollup columns come from customer_stats,
+    # which triggers keep current, so no page aggregates the sales table.
     def populate_customers(self):
-        for row in self.customer_tree.get_children():
-            self.customer_tree.delete(row)
-        for c in get_all_customers():
-            self.customer_tree.insert("", "end", iid=str(c[0]), values=c)
+        if self.customer_tree is None:
+            return
+        table = self.tables[self.customer_tree]
+        if table.source_key == self.customer_filters:
+            table.refresh()
+        else:
+            text, sort, segment = self.customer_filters
+            key = customer_revenue_key if sort == "revenue" else customer_key
+            table.set_pager(KeysetPager(lambda after, limit: search_customers(text, after, limit, with_stats=True,
+                                                                              sort=sort, segment=segment), key),
+                            key=self.customer_filters)
+        self.populate_customer_history()
+
+    def populate_customer_history(self):
+        """Rollup and sales of the selected customer, read through idx_sales_customer_date."""
+        if self.customer_history_tree is None:
+            return
+        cid = self.selected_customer_id
+        table = self.tables[self.customer_history_tree]
+        summary_key = (cid, table_version("sales"))
+        if summary_key != self.customer_summary_key:
+            self.customer_summary_key = summary_key
+            if cid is None:
+                text = "Select a customer to see their purchases."
+            else:
+                orders, revenue, profit, last_purchase = get_customer_stats(cid)
+                text = (f"{orders} orders | Revenue ${format_cents(revenue)} | Profit ${format_cents(profit)} | "
+                        f"Last purchase: {last_purchase or '-'}")
+            self.customer_summary_label.config(text=text)
+        if cid is None:
+            if table.source_key is not None:
+                table.set_rows([])
+            return
+        if table.source_key == cid:
+            table.refresh()
+            return
+        table.set_pager(KeysetPager(lambda after, limit: repository.sales_after(after, limit, customer_id=cid),
+                                    sale_key), key=cid)
+
+    def on_customer_search_key(self, event):
+        if self.customer_search_timer is not None:
+            self.root.after_cancel(self.customer_search_timer)
+        self.customer_search_timer = self.root.after(CUSTOMER_SEARCH_DEBOUNCE_MS, self.apply_customer_search)
+
+    def apply_customer_search(self):
+        self.customer_search_timer = None
+        segment = CUSTOMER_SEGMENT_LABELS[self.customer_segment_var.get()]
+        # Customers with no purchases have no revenue to rank by
+        if segment == "none":
+            self.customer_sort_var.set("Name")
+        self.customer_sort_box.config(state="disabled" if segment == "none" else "readonly")
+        self.customer_filters = (self.customer_search_entry.get().strip(),
+                                 CUSTOMER_SORTS[self.customer_sort_var.get()], segment)
+        self.populate_customers()
+
+    def clear_customer_search(self):
+        self.customer_search_entry.delete(0, "end")
+        self.customer_sort_var.set("Name")
+        self.customer_segment_var.set("All")
+        self.apply_customer_search()
 
+    # Sales history is keyset-paginated by (date, id): the tab loads one
+    # page on open and more as the user scrolls to the end.
     def populate_sales(self):
-        for row in self.sales_tree.get_children():
-            self.sales_tree.delete(row)
-        for s in get_all_sales():
-            self.sales_tree.insert("", "end", values=s)
+        if self.sales_tree is None:
+            return
+        table = self.tables[self.sales_tree]
+        key = tuple(sorted(self.sales_filters.items()))
+        if table.source_key == key:
+            table.refresh()
+            return
+        filters = dict(self.sales_filters)
+        table.set_pager(KeysetPager(lambda after, limit: repository.sales_after(after, limit, **filters), sale_key),
+                        key=key)
+
+    def apply_sales_filter(self):
+        filters = {}
+        try:
+            start = self.sales_from_entry.get().strip()
+            if start:
+                filters["start"] = datetime.strptime(start, "%Y-%m-%d").strftime("%Y-%m-%d")
+            end = self.sales_to_entry.get().strip()
+            if end:
+                # "To" is inclusive; the query's end bound is not
+                filters["end"] = (datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        except ValueError:
+            messagebox.showerror("Invalid Input", "Dates must be in YYYY-MM-DD format")
+            return
+        if self.sales_fragrance_var.get():
+            if not self.selected_id:
+                messagebox.showwarning("No Selection", "Select a fragrance to filter by")
+                return
+            filters["fragrance_id"] = self.selected_id
+        if self.sales_customer_var.get():
+            if not self.selected_customer_id:
+                messagebox.showwarning("No Selection", "Select a customer to filter by")
+                return
+            filters["customer_id"] = self.selected_customer_id
+        self.sales_filters = filters
+        self.populate_sales()
+
+    def clear_sales_filter(self):
+        self.sales_from_entry.delete(0, "end")
+        self.sales_to_entry.delete(0, "end")
+        self.sales_fragrance_var.set(False)
+        self.sales_customer_var.set(False)
+        self.sales_filters = {}
+        self.populate_sales()
 
     def populate_supplies(self):
-        for row in self.supplies_tree.get_children():
-            self.supplies_tree.delete(row)
-        for s in get_all_supplies():
-            self.supplies_tree.insert("", "end", iid=str(s[0]), values=s)
+        if self.supplies_tree is not None:
+            self.tables[self.supplies_tree].refresh()
 
     def populate_oils(self):
-        for row in self.oils_tree.get_children():
-            self.oils_tree.delete(row)
-        for o in get_all_oils():
-            self.oils_tree.insert("", "end", iid=str(o[0]), values=o)
+        if self.oils_tree is not None:
+            self.tables[self.oils_tree].refresh()
 
     # ---------------- PREFILL (No functional change) ----------------
-    def prefill_fragrances(self):
-        prefill_list = [
-
-        ]
-        
-        for f in prefill_list:
-            if not get_fragrance_by_name(f[0]):
-                insert_fragrance(f)
-        self.refresh_all_tables()
+    def prefill_defaults(self):
+        """Seed the default rows that are missing, one batched check per table."""
+        repository.insert_missing("fragrances", [
 
-    def prefill_supplies(self):
-        prefill_list = [
+        ])
+        repository.insert_missing("supplies", [
             ("Bottles", 1.5, "https://example.com/bottles", 50),
             ("Sprayers", 0.8, "https://example.com/sprayers", 100)
-        ]
-        for s in prefill_list:
-            if not get_supply_by_name(s[0]):
-                insert_supply(s)
-        self.populate_supplies()
-
-    def prefill_oils(self):
-        prefill_list = [
+        ])
+        repository.insert_missing("oils", [
             ("Jasmine Oil", 10, 5.0, "https://example.com/jasmine", 20),
             ("Rose Oil", 15, 7.5, "https://example.com/rose", 15)
-        ]
-        for o in prefill_list:
-            if not get_oil_by_name(o[0]):
-                insert_oil(o)
-        self.populate_oils()
+        ])
 
     # ---------------- SELECTION & VIEW (No functional change) ----------------
     def on_fragrance_select(self, event):
         tree = event.widget
-        selected = tree.selection()
+        selected = self.tables[tree].selection()
         
         if not selected:
             self.selected_id = None
@@ -359,6 +692,52 @@ class FragranceManagerApp:
 
         self.selected_id = int(selected[0])
         self.update_fragrance_viewer(self.selected_id)
+        self.prefetch_neighbour_images(tree, selected[0])
+
+    def prefetch_neighbour_images(self, tree, iid):
+        """Decode images of rows next to the selection so arrowing is instant."""
+        for f in self.tables[tree].rows_around(iid, PREFETCH_RADIUS):
+            path = self.fragrance_image_path(f, VIEWER_IMAGE_SIZE)
+            if path:
+                self.image_cache.prefetch(path, VIEWER_IMAGE_SIZE)
+
+    def import_legacy_image(self, path):
+        """store_image() for a path saved before the image store; None if it cannot be read."""
+        if not os.path.exists(path):
+            return None
+        try:
+            return store_image(path, IMAGE_DIR, (VIEWER_IMAGE_SIZE, ROW_THUMB_SIZE))
+        except Exception:
+            return None
+
+    def import_legacy_images(self):
+        """Copy images saved before the image store into it, in the background.
+
+        One writer job per image, so saves made meanwhile are not queued
+        behind the whole backlog. Files that are gone keep their old path.
+        """
+        def import_one(fid, path):
+            stored = self.import_legacy_image(path)
+            return stored is not None and repository.set_imported_image(fid, path, stored[1], stored[0])
+
+        def next_image(rows, imported=0):
+            if not rows:
+                if imported:
+                    self.refresh_all_tables()
+                return
+            fid, path = rows.pop()
+            self.tasks.background(import_one, fid, path,
+                                  on_done=lambda ok: next_image(rows, imported + ok),
+                                  on_error=lambda e: next_image(rows, imported))
+        self.tasks.background(get_unimported_images, on_done=next_image)
+
+    def fragrance_image_path(self, f, size):
+        """Pre-scaled copy of a fragrance's image at size, else the original file."""
+        if f[10]:
+            thumb = thumbnail_path(IMAGE_DIR, f[10], size)
+            if os.path.exists(thumb):
+                return thumb
+        return f[9]
 
     def update_fragrance_viewer(self, fid):
         if not fid:
@@ -368,11 +747,12 @@ class FragranceManagerApp:
             self.current_fragrance_image = None
             return
 
-        f_data = get_fragrance_by_id(fid)
+        f_data = repository.fragrance(fid)
         if not f_data:
             return
 
-        name, desc, gender, _, unit_cost, sale_price, inspired_by, qty, img_path = f_data[1:]
+        name, desc, gender, _, unit_cost, sale_price, inspired_by, qty, _ = f_data[1:10]
+        img_path = self.fragrance_image_path(f_data, VIEWER_IMAGE_SIZE)
 
         self.image_viewer_frame.config(text=name)
 
@@ -380,37 +760,47 @@ class FragranceManagerApp:
             f"Name: {name}\n"
             f"Inspired By: {inspired_by}\n"
             f"Gender: {gender}\n"
-            f"Cost: ${unit_cost:.2f} | Price: ${sale_price:.2f}\n"
+            f"Cost: ${format_cents(unit_cost)} | Price: ${format_cents(sale_price)}\n"
             f"Stock: {qty}\n"
             f"\nDescription: {desc or 'N/A'}"
         )
         self.detail_text_label.config(text=details)
 
         if img_path and os.path.exists(img_path):
-            try:
-                img = Image.open(img_path).resize(VIEWER_IMAGE_SIZE) 
-                photo = ImageTk.PhotoImage(img)
-                self.current_fragrance_image = photo 
-                self.image_label.config(image=self.current_fragrance_image, text="")
-            except Exception:
-                self.image_label.config(text="Image Error", image='')
+            photo = self.image_cache.get(img_path, VIEWER_IMAGE_SIZE)
+            if photo:
+                self.show_viewer_image(fid, photo)
+            else:
+                self.image_label.config(text="Loading...", image='')
+                self.image_cache.request(img_path, VIEWER_IMAGE_SIZE,
+                                         lambda photo: self.show_viewer_image(fid, photo))
         else:
             self.image_label.config(text="No Image", image='')
 
+    def show_viewer_image(self, fid, photo):
+        if fid != self.selected_id:
+            return  # selection moved on while the image was decoding
+        if photo:
+            self.current_fragrance_image = photo
+            self.image_label.config(image=self.current_fragrance_image, text="")
+        else:
+            self.image_label.config(text="Image Error", image='')
+
 
     def on_customer_select(self, event):
         tree = event.widget
-        selected = tree.selection()
+        selected = self.tables[tree].selection()
         self.selected_customer_id = int(selected[0]) if selected else None
+        self.populate_customer_history()
 
     def on_supply_select(self, event):
         tree = event.widget
-        selected = tree.selection()
+        selected = self.tables[tree].selection()
         self.selected_supply_id = int(selected[0]) if selected else None
 
     def on_oil_select(self, event):
         tree = event.widget
-        selected = tree.selection()
+        selected = self.tables[tree].selection()
         self.selected_oil_id = int(selected[0]) if selected else None
 
     # ---------------- CRUD/FORMS/SEARCH (No functional change) ----------------
@@ -427,10 +817,11 @@ class FragranceManagerApp:
         if not self.selected_id:
             messagebox.showwarning("No Selection", "Select fragrance to delete")
             return
-        delete_fragrance(self.selected_id)
-        self.refresh_all_tables()
-        self.selected_id = None
-        self.update_fragrance_viewer(None)
+        def done(_):
+            self.selected_id = None
+            self.refresh_all_tables()
+            self.update_fragrance_viewer(None)
+        self.tasks.write(repository.delete_fragrance, self.selected_id, on_done=done)
 
     def add_customer(self):
         self.open_customer_form()
@@ -443,8 +834,10 @@ class FragranceManagerApp:
         if not self.selected_customer_id:
             messagebox.showwarning("No Selection", "Select customer to delete")
             return
-        delete_customer(self.selected_customer_id)
-        self.populate_customers()
+        def done(_):
+            self.selected_customer_id = None
+            self.populate_customers()
+        self.tasks.write(delete_customer, self.selected_customer_id, on_done=done)
 
     def add_supply(self):
         self.open_supply_form()
@@ -457,8 +850,7 @@ class FragranceManagerApp:
         if not self.selected_supply_id:
             messagebox.showwarning("No Selection", "Select supply to delete")
             return
-        delete_supply(self.selected_supply_id)
-        self.populate_supplies()
+        self.tasks.write(repository.delete_supply, self.selected_supply_id, on_done=lambda _: self.populate_supplies())
 
     def add_oil(self):
         self.open_oil_form()
@@ -471,34 +863,30 @@ class FragranceManagerApp:
         if not self.selected_oil_id:
             messagebox.showwarning("No Selection", "Select oil to delete")
             return
-        delete_oil(self.selected_oil_id)
-        self.populate_oils()
+        self.tasks.write(repository.delete_oil, self.selected_oil_id, on_done=lambda _: self.populate_oils())
 
     def record_sale(self):
         if not self.selected_id:
             messagebox.showwarning("No Selection", "Select fragrance to sell")
             return
-        all_customers = get_all_customers()
-        if not all_customers:
+        if not search_customers(limit=1):
             messagebox.showwarning("No Customers", "No customers found. Please add a customer first.")
             return
         form = tk.Toplevel(self.root)
         form.title("Record Sale")
-        form.geometry("400x300")
+        form.geometry("480x380")
 
-        ttk.Label(form, text="Customer:").grid(row=0, column=0, padx=5, pady=5)
-        customers = [f"{c[1]} (ID:{c[0]})" for c in all_customers]
-        customer_var = tk.StringVar()
-        cust_combo = ttk.Combobox(form, values=customers, textvariable=customer_var, state="readonly")
-        cust_combo.grid(row=0, column=1, padx=5, pady=5)
+        ttk.Label(form, text="Customer:").grid(row=0, column=0, padx=5, pady=5, sticky="n")
+        picker = self.customer_picker(form)
+        picker.grid(row=0, column=1, padx=5, pady=5)
 
         ttk.Label(form, text="Quantity:").grid(row=1, column=0, padx=5, pady=5)
         qty_entry = ttk.Entry(form)
         qty_entry.grid(row=1, column=1, padx=5, pady=5)
 
         def save_sale():
-            if not customer_var.get():
-                messagebox.showwarning("Error", "Select customer")
+            if picker.selected is None:
+                messagebox.showwarning("Error", "Select customer", parent=form)
                 return
             try:
                 qty = int(qty_entry.get())
@@ -507,28 +895,216 @@ class FragranceManagerApp:
             except:
                 messagebox.showerror("Error", "Quantity must be a positive number")
                 return
-            fragrance = get_fragrance_by_id(self.selected_id)
+            customer_id = picker.selected[0]
+            date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+            def done(_):
+                self.refresh_all_tables()
+                self.update_fragrance_viewer(self.selected_id)
+            self.submit_form(form, save_btn, repository.record_sale, self.selected_id, customer_id, qty, date, on_done=done)
+
+        save_btn = ttk.Button(form, text="Save Sale", command=save_sale)
+        save_btn.grid(row=2, column=1, pady=10)
+
+    def customer_picker(self, parent):
+        """Type-ahead customer search (name, email, phone or city prefix) for sale dialogs."""
+        return TypeAheadPicker(parent, search_customers, customer_key, ("Name", "Email", "Phone"),
+                               lambda c: (str(c[0]), (c[1], c[2] or "", c[3] or ""), ()))
+
+    def basket_sale(self):
+        """Sell several fragrances to one customer in a single checkout.
+
+        The dialog stays open while fragrances are picked in the main tables;
+        "Add Selected" puts the current selection in the basket.
+        """
+        if not search_customers(limit=1):
+            messagebox.showwarning("No Customers", "No customers found. Please add a customer first.")
+            return
+        form = tk.Toplevel(self.root)
+        form.title("Basket Sale")
+        form.geometry("540x640")
+
+        ttk.Label(form, text="Customer:").grid(row=0, column=0, padx=5, pady=5, sticky="n")
+        picker = self.customer_picker(form)
+        picker.grid(row=0, column=1, columnspan=2, padx=5, pady=5, sticky="w")
+
+        ttk.Label(form, text="Quantity:").grid(row=1, column=0, padx=5, pady=5)
+        qty_entry = ttk.Entry(form, width=8)
+        qty_entry.insert(0, "1")
+        qty_entry.grid(row=1, column=1, padx=5, pady=5, sticky="w")
+
+        columns = ("Fragrance", "Qty", "Sale Price", "Line Total")
+        basket_tree = ttk.Treeview(form, columns=columns, show="headings", height=10)
+        for col in columns:
+            basket_tree.heading(col, text=col)
+            basket_tree.column(col, width=120)
+        basket_tree.grid(row=3, column=0, columnspan=3, padx=5, pady=5)
+        total_label = ttk.Label(form, text="Total: $0.00", style='Bold.TLabel')
+        total_label.grid(row=4, column=1, pady=5)
+
+        lines = {}  # fragrance id -> [name, qty, sale_price in cents]
+
+        def redraw():
+            basket_tree.delete(*basket_tree.get_children())
+            total = 0
+            for fid, (name, qty, price) in lines.items():
+                total += price * qty
+                basket_tree.insert("", "end", iid=str(fid), values=(name, qty, format_cents(price), format_cents(price * qty)))
+            total_label.config(text=f"Total: ${format_cents(total)}")
+
+        def add_selected():
+            if not self.selected_id:
+                messagebox.showwarning("No Selection", "Select a fragrance in the main window first", parent=form)
+                return
+            try:
+                qty = int(qty_entry.get())
+                if qty <= 0:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Error", "Quantity must be a positive number", parent=form)
+                return
+            fragrance = repository.fragrance(self.selected_id)
             if not fragrance:
-                messagebox.showerror("Error", "Fragrance not found")
                 return
-            current_qty = int(fragrance[8])
-            if qty > current_qty:
-                messagebox.showerror("Error", f"Not enough stock. Available: {current_qty}")
+            line = lines.setdefault(fragrance[0], [fragrance[1], 0, fragrance[6]])
+            line[1] += qty
+            redraw()
+
+        def remove_line():
+            for iid in basket_tree.selection():
+                lines.pop(int(iid), None)
+            redraw()
+
+        def checkout():
+            if picker.selected is None:
+                messagebox.showwarning("Error", "Select customer", parent=form)
                 return
-            customer_id = int(customer_var.get().split("ID:")[1].replace(")", ""))
-            unit_cost = float(fragrance[5])
-            sale_price = float(fragrance[6])
-            revenue = sale_price * qty
-            profit = (sale_price - unit_cost) * qty
+            if not lines:
+                messagebox.showwarning("Error", "Basket is empty", parent=form)
+                return
+            customer_id = picker.selected[0]
             date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            insert_sale((self.selected_id, customer_id, qty, unit_cost, sale_price, revenue, profit, date))
-            update_fragrance_quantity(self.selected_id, current_qty - qty)
-            self.populate_sales()
+
+            def done(_):
+                self.refresh_all_tables()
+                self.update_fragrance_viewer(self.selected_id)
+            self.submit_form(form, checkout_btn, repository.record_basket_sale, customer_id,
+                             [(fid, line[1]) for fid, line in lines.items()], date, on_done=done)
+
+        btns = ttk.Frame(form)
+        btns.grid(row=2, column=0, columnspan=3, pady=5)
+        ttk.Button(btns, text="Add Selected", command=add_selected).pack(side="left", padx=5)
+        ttk.Button(btns, text="Remove Line", command=remove_line).pack(side="left", padx=5)
+        checkout_btn = ttk.Button(form, text="Checkout", command=checkout)
+        checkout_btn.grid(row=5, column=1, pady=10)
+
+        if self.selected_id:
+            add_selected()
+
+    def open_sales_report(self):
+        form = tk.Toplevel(self.root)
+        form.title("Sales Reports")
+        form.geometry("760x480")
+
+        controls = ttk.Frame(form)
+        controls.pack(fill="x", padx=5, pady=5)
+        ttk.Label(controls, text="Period:").pack(side="left", padx=5)
+        grain_var = tk.StringVar(value="month")
+        ttk.Combobox(controls, values=GRAINS, textvariable=grain_var, state="readonly", width=8).pack(side="left")
+        ttk.Label(controls, text="Group by:").pack(side="left", padx=5)
+        by_var = tk.StringVar(value="total")
+        ttk.Combobox(controls, values=DIMENSIONS, textvariable=by_var, state="readonly", width=10).pack(side="left")
+        ttk.Label(controls, text="From:").pack(side="left", padx=5)
+        start_entry = ttk.Entry(controls, width=11)
+        start_entry.pack(side="left")
+        ttk.Label(controls, text="To:").pack(side="left", padx=5)
+        end_entry = ttk.Entry(controls, width=11)
+        end_entry.pack(side="left")
+
+        columns = ("Period", "Group", "Units", "Revenue", "Profit", "Sales")
+        tree = ttk.Treeview(form, columns=columns, show="headings")
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=110, anchor="center")
+        tree.pack(fill="both", expand=True, padx=5, pady=5)
+        total_label = ttk.Label(form, style='Bold.TLabel')
+        total_label.pack(anchor="w", padx=5, pady=5)
+
+        def show(rows):
+            if not form.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            for period, _, label, units, revenue, profit, count in rows:
+                tree.insert("", "end", values=(period, label, units, format_cents(revenue), format_cents(profit), count))
+            units, revenue, profit, count = report_totals(rows)
+            total_label.config(text=f"Total: {units} units, revenue ${format_cents(revenue)}, "
+                                    f"profit ${format_cents(profit)}, {count} sales")
+
+        def run():
+            # On the writer: filling the rollup cache writes, and queueing
+            # behind pending sales means the report includes them.
+            self.tasks.write(sales_report, grain_var.get(), by_var.get(),
+                             start_entry.get().strip() or None, end_entry.get().strip() or None,
+                             on_done=show, on_error=lambda e: self.task_error(e, form))
+
+        ttk.Button(controls, text="Run", command=run).pack(side="left", padx=10)
+        run()
+
+    # ---------------- BULK EXPORT / IMPORT ----------------
+    def progress_window(self, title):
+        """Small window showing a running row count; returns (window, callback).
+
+        The callback may be called from a background task.
+        """
+        window = tk.Toplevel(self.root)
+        window.title(title)
+        label = ttk.Label(window, text="Starting...", width=40)
+        label.pack(padx=20, pady=20)
+
+        def show(count):
+            if window.winfo_exists():
+                label.config(text=f"{count} rows")
+        return window, lambda count: self.tasks.post(show, count)
+
+    def export_data(self, table):
+        path = filedialog.asksaveasfilename(title=f"Export {table}", defaultextension=".csv",
+                                            initialfile=f"{table}.csv", filetypes=DATA_FILETYPES)
+        if not path:
+            return
+        window, progress = self.progress_window(f"Exporting {table}")
+
+        def done(count):
+            window.destroy()
+            messagebox.showinfo("Export", f"Exported {count} {table} rows to {path}")
+
+        def failed(e):
+            window.destroy()
+            messagebox.showerror("Export Failed", str(e))
+        self.tasks.read(export_table, table, path, progress=progress, on_done=done, on_error=failed)
+
+    def import_data(self, table):
+        path = filedialog.askopenfilename(title=f"Import {table}", filetypes=DATA_FILETYPES)
+        if not path:
+            return
+        window, progress = self.progress_window(f"Importing {table}")
+
+        def done(count):
+            window.destroy()
             self.refresh_all_tables()
-            self.update_fragrance_viewer(self.selected_id)
-            form.destroy()
+            messagebox.showinfo("Import", f"Imported {count} {table} rows from {path}")
 
-        ttk.Button(form, text="Save Sale", command=save_sale).grid(row=2, column=1, pady=10)
+        def failed(e):
+            # chunks before the bad row are already in
+            window.destroy()
+            self.refresh_all_tables()
+            messagebox.showerror("Import Failed", str(e))
+        def job():
+            try:
+                return import_table(table, path, progress=progress)
+            finally:
+                # on the writer, so the Tk thread never reloads a whole table
+                repository.reload(table)
+        self.tasks.write(job, on_done=done, on_error=failed)
 
     def choose_image(self, entry_widget):
         path = filedialog.askopenfilename(
@@ -540,7 +1116,7 @@ class FragranceManagerApp:
             entry_widget.insert(0, path)
 
     def open_fragrance_form(self, edit=False):
-        f_data = get_fragrance_by_id(self.selected_id) if edit else None
+        f_data = repository.fragrance(self.selected_id) if edit else None
         form = tk.Toplevel(self.root)
         form.title("Edit Fragrance" if edit else "Add Fragrance")
         form.geometry("400x400")
@@ -553,22 +1129,45 @@ class FragranceManagerApp:
             entry = ttk.Entry(form)
             entry.grid(row=i, column=1, padx=5, pady=5)
             if edit and f_data:
-                entry.insert(0, f_data[i+1] if i+1 < len(f_data) else "") 
+                value = f_data[i+1]
+                if field in ("Unit Cost", "Sale Price"):
+                    value = format_cents(value)
+                entry.insert(0, value if value is not None else "")
             entries[field] = entry
 
         ttk.Button(form, text="Choose Image", command=lambda: self.choose_image(entries["Image"])).grid(row=8, column=2, padx=5)
 
-        def save():
-            data = [entries[f].get() for f in fields]
+        fid = self.selected_id if edit else None
+
+        def write(data):
+            # Runs on the writer thread: copying and scaling the image is
+            # file I/O too.
+            image_hash = f_data.image_hash if f_data else None
+            unchanged = f_data is not None and data[8] == (f_data.image or "")
+            if not data[8]:
+                image_hash = None
+            elif not unchanged:
+                try:
+                    image_hash, data[8] = store_image(data[8], IMAGE_DIR, (VIEWER_IMAGE_SIZE, ROW_THUMB_SIZE))
+                except Exception as e:
+                    raise ValueError(f"Could not import image: {e}") from e
+            elif image_hash is None:
+                # A path saved before the image store: import it if it is
+                # still there, but never refuse an edit because it is not.
+                image_hash, data[8] = self.import_legacy_image(data[8]) or (None, data[8])
             if edit:
-                update_fragrance(self.selected_id, data)
+                repository.update_fragrance(fid, data, image_hash)
             else:
-                insert_fragrance(data)
-            self.refresh_all_tables()
-            self.update_fragrance_viewer(self.selected_id)
-            form.destroy()
+                repository.insert_fragrance(data, image_hash)
 
-        ttk.Button(form, text="Save", command=save).grid(row=9, column=1, pady=10)
+        def save():
+            def done(_):
+                self.refresh_all_tables()
+                self.update_fragrance_viewer(self.selected_id)
+            self.submit_form(form, save_btn, write, [entries[f].get() for f in fields], on_done=done)
+
+        save_btn = ttk.Button(form, text="Save", command=save)
+        save_btn.grid(row=9, column=1, pady=10)
 
     def open_customer_form(self, edit=False):
         c_data = get_customer_by_id(self.selected_customer_id) if edit else None
@@ -588,16 +1187,16 @@ class FragranceManagerApp:
         def save():
             data = [entries[f].get() for f in fields]
             if edit:
-                update_customer(self.selected_customer_id, data)
+                self.submit_form(form, save_btn, update_customer, self.selected_customer_id, data,
+                                 on_done=lambda _: self.populate_customers())
             else:
-                insert_customer(data)
-            self.populate_customers()
-            form.destroy()
+                self.submit_form(form, save_btn, insert_customer, data, on_done=lambda _: self.populate_customers())
 
-        ttk.Button(form, text="Save", command=save).grid(row=len(fields), column=1, pady=10)
+        save_btn = ttk.Button(form, text="Save", command=save)
+        save_btn.grid(row=len(fields), column=1, pady=10)
 
     def open_supply_form(self, edit=False):
-        s_data = get_supply_by_id(self.selected_supply_id) if edit else None
+        s_data = repository.supply(self.selected_supply_id) if edit else None
         form = tk.Toplevel(self.root)
         form.title("Edit Supply" if edit else "Add Supply")
         form.geometry("400x300")
@@ -608,22 +1207,22 @@ class FragranceManagerApp:
             entry = ttk.Entry(form)
             entry.grid(row=i, column=1, padx=5, pady=5)
             if edit and s_data:
-                entry.insert(0, s_data[i+1])
+                value = s_data[i+1]
+                entry.insert(0, format_cents(value) if field == "Price" else value)
             entries[field] = entry
 
         def save():
             data = [entries[f].get() for f in fields]
             if edit:
-                update_supply(self.selected_supply_id, data)
+                self.submit_form(form, save_btn, repository.update_supply, self.selected_supply_id, data, on_done=lambda _: self.populate_supplies())
             else:
-                insert_supply(data)
-            self.populate_supplies()
-            form.destroy()
+                self.submit_form(form, save_btn, repository.insert_supply, data, on_done=lambda _: self.populate_supplies())
 
-        ttk.Button(form, text="Save", command=save).grid(row=len(fields), column=1, pady=10)
+        save_btn = ttk.Button(form, text="Save", command=save)
+        save_btn.grid(row=len(fields), column=1, pady=10)
 
     def open_oil_form(self, edit=False):
-        o_data = get_oil_by_id(self.selected_oil_id) if edit else None
+        o_data = repository.oil(self.selected_oil_id) if edit else None
         form = tk.Toplevel(self.root)
         form.title("Edit Oil" if edit else "Add Oil")
         form.geometry("400x300")
@@ -634,25 +1233,49 @@ class FragranceManagerApp:
             entry = ttk.Entry(form)
             entry.grid(row=i, column=1, padx=5, pady=5)
             if edit and o_data:
-                entry.insert(0, o_data[i+1])
+                value = o_data[i+1]
+                entry.insert(0, format_cents(value) if field == "Price" else value)
             entries[field] = entry
 
         def save():
             data = [entries[f].get() for f in fields]
             if edit:
-                update_oil(self.selected_oil_id, data)
+                self.submit_form(form, save_btn, repository.update_oil, self.selected_oil_id, data, on_done=lambda _: self.populate_oils())
             else:
-                insert_oil(data)
-            self.populate_oils()
-            form.destroy()
+                self.submit_form(form, save_btn, repository.insert_oil, data, on_done=lambda _: self.populate_oils())
 
-        ttk.Button(form, text="Save", command=save).grid(row=len(fields), column=1, pady=10)
+        save_btn = ttk.Button(form, text="Save", command=save)
+        save_btn.grid(row=len(fields), column=1, pady=10)
 
     def search_fragrance(self):
-        query = self.search_entry.get()
-        self.populate_table(self.men_tree, "Men", query)
-        self.populate_table(self.women_tree, "Women", query)
-        self.populate_table(self.unisex_tree, "Unisex", query)
+        query = self.search_entry.get().strip()
+        if not query:
+            self.clear_search()
+            return
+        self.live_search.submit(query)
+
+    def on_search_key(self, event):
+        query = self.search_entry.get().strip()
+        if not query:
+            if self.live_search.query is not None:
+                self.live_search.cancel()
+                self.refresh_all_tables()
+            return
+        self.live_search.schedule(query)
+
+    def clear_search(self):
+        self.search_entry.delete(0, "end")
+        self.live_search.cancel()
+        self.refresh_all_tables()
+
+    def show_search_results(self, results):
+        by_gender = {"Men": [], "Women": [], "Unisex": []}
+        for f in results:
+            if f[3] in by_gender:
+                by_gender[f[3]].append(f)
+        for tree, gender in ((self.men_tree, "Men"), (self.women_tree, "Women"), (self.unisex_tree, "Unisex")):
+            if tree is not None:
+                self.tables[tree].set_rows(by_gender[gender])
 
     def refresh_all_tables(self):
         self.populate_table(self.men_tree, "Men")
@@ -662,14 +1285,125 @@ class FragranceManagerApp:
         self.populate_sales()
         self.populate_supplies()
         self.populate_oils()
-        if not self.selected_id or not get_fragrance_by_id(self.selected_id):
+        self.update_dashboard()
+        if not self.selected_id or not repository.fragrance(self.selected_id):
             self.update_fragrance_viewer(None)
 
+    # ---------------- DASHBOARD ----------------
+    def update_dashboard(self):
+        version = table_version("fragrances")
+        if version == self.dashboard_version:
+            return
+        self.dashboard_version = version
+        skus, units, cost, retail, low = get_inventory_totals()
+        lines = [f"Inventory: {skus} fragrances, {units} units | Cost ${format_cents(cost)} | "
+                 f"Retail ${format_cents(retail)} | Low stock: {low}"]
+        for gender, g_skus, g_units, g_cost, g_retail, g_low in get_inventory_summary():
+            lines.append(f"{gender or 'Unassigned'}: {g_units} units, cost ${format_cents(g_cost)}, "
+                         f"retail ${format_cents(g_retail)}, {g_low} low")
+        self.dashboard_label.config(text="\n".join(lines))
+
+    def low_stock_report(self):
+        rows = get_low_stock_fragrances()
+        form = tk.Toplevel(self.root)
+        form.title("Low Stock Report")
+        form.geometry("600x400")
+
+        ttk.Label(form, text=f"{len(rows)} fragrances with fewer than {LOW_STOCK_THRESHOLD} units",
+                  style='Bold.TLabel').pack(anchor="w", padx=5, pady=5)
+        columns = ("Name", "Gender", "Quantity", "Unit Cost", "Sale Price")
+        tree = ttk.Treeview(form, columns=columns, show="headings")
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=110, anchor="center")
+        tree.pack(fill="both", expand=True, padx=5, pady=5)
+        for f in rows:
+            tree.insert("", "end", iid=str(f[0]),
+                        values=(f[1], f[3] or "", f[8], format_cents(f[5]), format_cents(f[6])))
+
+    # ---------------- DIAGNOSTICS ----------------
+    def open_diagnostics(self):
+        """Per-action query statistics; only reachable when instrumented."""
+        form = tk.Toplevel(self.root)
+        form.title("Diagnostics")
+        form.geometry("960x640")
+
+        controls = ttk.Frame(form)
+        controls.pack(fill="x", padx=5, pady=5)
+        ttk.Label(controls, text=f"Connections opened: {connection_open_count()}").pack(side="left", padx=5)
+
+        columns = ("Action", "Runs", "p50 ms", "p95 ms", "Max ms", "Queries/run", "Rows/run", "Opens")
+        summary_tree = ttk.Treeview(form, columns=columns, show="headings", height=8)
+        for col in columns:
+            summary_tree.heading(col, text=col)
+            summary_tree.column(col, width=90, anchor="center")
+        summary_tree.column("Action", width=260, anchor="w")
+        summary_tree.pack(fill="both", expand=True, padx=5, pady=5)
+
+        columns = ("Time", "Action", "ms", "Queries", "Rows", "Opens", "Repeated SQL")
+        recent_tree = ttk.Treeview(form, columns=columns, show="headings", height=8)
+        for col in columns:
+            recent_tree.heading(col, text=col)
+            recent_tree.column(col, width=90, anchor="center")
+        recent_tree.column("Action", width=260, anchor="w")
+        recent_tree.pack(fill="both", expand=True, padx=5, pady=5)
+
+        detail = tk.Text(form, height=12, wrap="none", font=("Courier", 9))
+        detail.pack(fill="both", expand=True, padx=5, pady=5)
+        actions = []
+
+        def show_text(text):
+            detail.delete("1.0", "end")
+            detail.insert("1.0", text)
+
+        def refresh():
+            summary_tree.delete(*summary_tree.get_children())
+            for name, runs, p50, p95, most, queries, rows, opens in instrument.summary():
+                summary_tree.insert("", "end", iid=name, values=(
+                    name, runs, f"{p50:.1f}", f"{p95:.1f}", f"{most:.1f}", f"{queries:.1f}", f"{rows:.1f}", opens))
+            recent_tree.delete(*recent_tree.get_children())
+            actions[:] = instrument.recent()
+            for i, act in enumerate(actions):
+                recent_tree.insert("", "end", iid=str(i), values=(
+                    datetime.fromtimestamp(act.started).strftime("%H:%M:%S"), act.name, f"{act.ms:.1f}",
+                    act.queries, act.rows, act.opens, max((n for _, n in act.repeated()), default="")))
+
+        def on_summary_select(event):
+            selection = summary_tree.selection()
+            if selection:
+                show_text(instrument.describe_histogram(selection[0]))
+
+        def on_recent_select(event):
+            selection = recent_tree.selection()
+            if selection:
+                show_text(instrument.describe(actions[int(selection[0])]))
+
+        def reset():
+            instrument.reset()
+            show_text("")
+            refresh()
+
+        def save_profile():
+            path = filedialog.asksaveasfilename(title="Save profile", defaultextension=".prof",
+                                                initialfile="ljfm.prof")
+            if path:
+                instrument.dump_profile(path)
+                messagebox.showinfo("Profile", f"cProfile stats written to {path}", parent=form)
+
+        summary_tree.bind("<<TreeviewSelect>>", on_summary_select)
+        recent_tree.bind("<<TreeviewSelect>>", on_recent_select)
+        ttk.Button(controls, text="Refresh", command=refresh).pack(side="left", padx=5)
+        ttk.Button(controls, text="Reset", command=reset).pack(side="left", padx=5)
+        if instrument.profiling():
+            ttk.Button(controls, text="Save Profile...", command=save_profile).pack(side="left", padx=5)
+        refresh()
+
 # ---------------- RUN APP ----------------
 if __name__ == "__main__":
     if not os.path.exists('assets'):
         os.makedirs('assets')
     
     root = tk.Tk()
+    instrument.enable_from_env(FragranceManagerApp)
     app = FragranceManagerApp(root)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,81 @@
+from tkinter import ttk
+
+from tableview import KeysetPager, VirtualTable
+
+PICKER_DEBOUNCE_MS = 150
+PICKER_ROWS = 8
+PICKER_PAGE_SIZE = 50
+
+# ---------------- TYPE-AHEAD PICKER ----------------
+class TypeAheadPicker(ttk.Frame):
+    """Search box over a short list of matches, for choosing one row.
+
+    search(text, after, limit) returns the next page of matches in key(row)
+    order, e.g. database.search_customers with customer_key. Nothing is
+    loaded up front: opening the picker reads one page, typing re-runs the
+    search after a short pause, and scrolling pages in more. format_row(row)
+    returns (iid, values, tags) as for VirtualTable. The chosen row is in
+    .selected (None until one is picked); on_select(row) is called too.
+    """
+
+    def __init__(self, parent, search, key, columns, format_row, on_select=None,
+                 page_size=PICKER_PAGE_SIZE):
+        super().__init__(parent)
+        self.search = search
+        self.key = key
+        self.format_row = format_row
+        self.on_select = on_select
+        self.page_size = page_size
+        self.selected = None
+        self.text = None
+        self._rows = {}      # iid -> row, for rows paged in for the current text
+        self._timer = None
+
+        self.entry = ttk.Entry(self)
+        self.entry.pack(fill="x", pady=(0, 2))
+        table_frame = ttk.Frame(self)
+        table_frame.pack(fill="both", expand=True)
+        self.tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=PICKER_ROWS,
+                                 selectmode="browse")
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=120)
+        self.tree.pack(side="left", fill="both", expand=True)
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical")
+        scrollbar.pack(side="right", fill="y")
+        self.table = VirtualTable(self.tree, scrollbar, self._format)
+
+        self.entry.bind("<KeyRelease>", self._on_key)
+        self.entry.bind("<Down>", lambda e: self.tree.focus_set())
+        self.tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        self.show("")
+
+    def show(self, text):
+        """Run the search for text now and list the first page."""
+        if self._timer is not None:
+            self.after_cancel(self._timer)
+            self._timer = None
+        if text == self.text:
+            return
+        self.text = text
+        self.selected = None
+        self._rows = {}
+        self.table.clear_selection()
+        self.table.set_pager(KeysetPager(lambda after, limit: self.search(text, after, limit),
+                                         self.key, self.page_size), key=text)
+
+    def _format(self, row):
+        iid, values, tags = self.format_row(row)
+        self._rows[iid] = row
+        return iid, values, tags
+
+    def _on_key(self, event):
+        if self._timer is not None:
+            self.after_cancel(self._timer)
+        self._timer = self.after(PICKER_DEBOUNCE_MS, lambda: self.show(self.entry.get().strip()))
+
+    def _on_select(self, event):
+        iids = self.table.selection()
+        self.selected = self._rows.get(iids[0]) if iids else None
+        if self.selected is not None and self.on_select:
+            self.on_select(self.selected)
@@ -0,0 +1,157 @@
+from datetime import date, timedelta
+
+from database import get_conn, transaction
+
+GRAINS = ("day", "week", "month")
+DIMENSIONS = ("total", "fragrance", "customer", "gender")
+OPEN_END = "9999-12-31"
+
+# First day of the period a sale falls in; weeks start on Monday.
+PERIOD_SQL = {
+    "day": "date(s.date)",
+    "week": "date(s.date, 'weekday 0', '-6 days')",
+    "month": "date(s.date, 'start of month')",
+}
+
+# How each report dimension groups and labels the cached rollup rows r.
+# Gender is resolved through the fragrance rollups at read time, so
+# re-assigning a fragrance's gender never leaves stale cache entries.
+GROUPING = {
+    "total": ("NULL", "'All'", ""),
+    "fragrance": ("r.key", "COALESCE(f.name, '(deleted)')", "LEFT JOIN fragrances f ON f.id = r.key"),
+    "customer": ("r.key", "COALESCE(c.name, '(no customer)')", "LEFT JOIN customers c ON c.id = r.key"),
+    "gender": ("COALESCE(f.gender, '')", "COALESCE(f.gender, '')", "LEFT JOIN fragrances f ON f.id = r.key"),
+}
+
+# ---------------- PERIODS ----------------
+def period_start(day, grain):
+    if grain == "day":
+        return day
+    if grain == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+def next_period(start, grain):
+    if grain == "day":
+        return start + timedelta(days=1)
+    if grain == "week":
+        return start + timedelta(days=7)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def _to_date(value):
+    if value is None or isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value).strip()[:10])
+    except ValueError:
+        raise ValueError(f"Invalid date: {value!r} (expected YYYY-MM-DD)")
+
+# ---------------- CACHE ----------------
+def _fill_cache(conn, grain, dimension, lo, hi):
+    """Compute and store every closed period in [lo, hi) not cached yet.
+
+    Missing periods are gathered into contiguous runs and each run is one
+    GROUP BY over a range of idx_sales_date.
+    """
+    cached = {row[0] for row in conn.execute(
+        "SELECT period_start FROM sales_rollup_periods "
+        "WHERE grain = ? AND dimension = ? AND period_start >= ? AND period_start < ?",
+        (grain, dimension, lo.isoformat(), hi.isoformat()))}
+    missing = []
+    start = lo
+    while start < hi:
+        end = next_period(start, grain)
+        if start.isoformat() not in cached:
+            missing.append((start.isoformat(), end.isoformat()))
+        start = end
+    if not missing:
+        return
+
+    runs = []
+    for start, end in missing:
+        if runs and runs[-1][1] == start:
+            runs[-1][1] = end
+        else:
+            runs.append([start, end])
+    column = "customer_id" if dimension == "customer" else "fragrance_id"
+    for run_start, run_end in runs:
+        rows = conn.execute(f"""
+            SELECT {PERIOD_SQL[grain]}, s.{column}, SUM(s.qty_sold), SUM(s.revenue), SUM(s.profit), COUNT(*)
+            FROM sales s
+            WHERE s.date >= ? AND s.date < ?
+            GROUP BY 1, 2
+        """, (run_start, run_end)).fetchall()
+        conn.executemany("""
+            INSERT INTO sales_rollup_cache
+                (grain, dimension, period_start, period_end, key, units, revenue, profit, sale_count)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(grain, dimension, start, next_period(date.fromisoformat(start), grain).isoformat(), *rest)
+              for start, *rest in rows])
+    conn.executemany(
+        "INSERT OR REPLACE INTO sales_rollup_periods (grain, dimension, period_start, period_end) VALUES (?, ?, ?, ?)",
+        [(grain, dimension, start, end) for start, end in missing])
+
+# ---------------- REPORTS ----------------
+def sales_report(grain="month", by="total", start=None, end=None, today=None):
+    """Units, revenue and profit per period, optionally split by a dimension.
+
+    Returns rows of (period_start, key, label, units, revenue, profit,
+    sale_count) with money in integer cents, ordered by period and then by
+    revenue. start and end are dates or ISO strings, widened to whole
+    periods; end is exclusive. Periods that closed before today's are read
+    from the rollup cache (filled on first use, dropped by triggers when a
+    sale in them changes), so only the current period touches sales rows.
+    """
+    if grain not in GRAINS:
+        raise ValueError(f"Unknown report grain: {grain}")
+    if by not in DIMENSIONS:
+        raise ValueError(f"Unknown report dimension: {by}")
+    start, end = _to_date(start), _to_date(end)
+    current = period_start(today or date.today(), grain)
+    dimension = "customer" if by == "customer" else "fragrance"
+
+    if start is None:
+        with get_conn() as conn:
+            first = conn.execute("SELECT MIN(date) FROM sales WHERE date IS NOT NULL").fetchone()[0]
+        if first is None:
+            return []
+        start = _to_date(first)
+    lo = period_start(start, grain)
+    if end is not None:
+        end = period_start(end - timedelta(days=1), grain)
+        end = next_period(end, grain)
+    closed_end = min(current, end) if end is not None else current
+
+    if lo < closed_end:
+        with transaction() as conn:
+            _fill_cache(conn, grain, dimension, lo, closed_end)
+
+    live_lo = max(lo, closed_end).isoformat()
+    live_hi = end.isoformat() if end is not None else OPEN_END
+    key, label, join = GROUPING[by]
+    column = "customer_id" if dimension == "customer" else "fragrance_id"
+    with get_conn() as conn:
+        return conn.execute(f"""
+            WITH r(period_start, key, units, revenue, profit, sale_count) AS (
+                SELECT period_start, key, units, revenue, profit, sale_count
+                FROM sales_rollup_cache
+                WHERE grain = ? AND dimension = ? AND period_start >= ? AND period_start < ?
+                UNION ALL
+                SELECT {PERIOD_SQL[grain]}, s.{column}, SUM(s.qty_sold), SUM(s.revenue), SUM(s.profit), COUNT(*)
+                FROM sales s
+                WHERE s.date >= ? AND s.date < ?
+                GROUP BY 1, 2
+            )
+            SELECT r.period_start, {key}, {label}, SUM(r.units), SUM(r.revenue), SUM(r.profit), SUM(r.sale_count)
+            FROM r {join}
+            GROUP BY r.period_start, {key}
+            ORDER BY r.period_start, SUM(r.revenue) DESC
+        """, (grain, dimension, lo.isoformat(), closed_end.isoformat(), live_lo, live_hi)).fetchall()
+
+def report_totals(rows):
+    """(units, revenue, profit, sale_count) summed over sales_report() rows."""
+    totals = [0, 0, 0, 0]
+    for row in rows:
+        for i, value in enumerate(row[3:]):
+            totals[i] += value or 0
+    return tuple(totals)
@@ -0,0 +1,248 @@
+"""In-memory cache of the catalogue tables, read by the UI instead of SQLite.
+
+Fragrances, supplies and oils are each loaded whole on first use
+into compact namedtuples (same field order as SELECT *, so code indexing
+rows by position keeps working) and indexed by id and, for fragrances,
+gender.
+
+Writes made through this module go to SQLite and then patch the cache: the
+rows they touched are read back by id and swapped into every index, so a
+sale costs one row lookup however large the catalogue is. Whole tables are
+reloaded only by reload(), after bulk writes, and poll_external_changes(),
+which notices writes by other processes; the app runs both on its writer
+thread, never on the Tk thread. Writes made straight through database.py
+are not seen until one of them runs.
+
+Sales and customers are not cached: both are read page by page straight
+from SQLite (see database.iter_sales() and database.search_customers());
+sales_after() only wraps the sale rows in Sale tuples.
+"""
+import itertools
+import threading
+from collections import namedtuple
+
+import database
+
+Fragrance = namedtuple("Fragrance", "id name description gender category unit_cost sale_price "
+                                    "inspired_by quantity image image_hash")
+Sale = namedtuple("Sale", "id fragrance customer qty_sold unit_cost sale_price revenue profit date")
+Supply = namedtuple("Supply", "id name price purchase_link quantity")
+Oil = namedtuple("Oil", "id name size price purchase_link quantity")
+
+# table -> (row type, loader, single-row getter in database.py)
+TABLES = {
+    "fragrances": (Fragrance, "get_all_fragrances", "get_fragrance_by_id"),
+    "supplies": (Supply, "get_all_supplies", "get_supply_by_id"),
+    "oils": (Oil, "get_all_oils", "get_oil_by_id"),
+}
+
+# ---------------- CACHE ----------------
+def _find(rows, row_id):
+    """Index of the first row whose id is >= row_id; rows are in id order."""
+    lo, hi = 0, len(rows)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if rows[mid].id < row_id:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+def _put(rows, row_id, row):
+    """rows with the row for row_id replaced, added or (row None) removed.
+
+    A replacement is made in place; anything that changes the length
+    returns a new list, so readers already slicing the old one are not
+    shifted under their feet.
+    """
+    i = _find(rows, row_id)
+    present = i < len(rows) and rows[i].id == row_id
+    if present and row is not None:
+        rows[i] = row
+        return rows
+    if present:
+        return rows[:i] + rows[i + 1:]
+    if row is not None:
+        return rows[:i] + [row] + rows[i:]
+    return rows
+
+def _reindex(index, field, old, row):
+    """Move one row between the id-ordered lists of a dict keyed by field."""
+    if old is not None:
+        key = getattr(old, field)
+        if row is None or getattr(row, field) != key:
+            rows = _put(index[key], old.id, None)
+            if rows:
+                index[key] = rows
+            else:
+                del index[key]
+    if row is not None:
+        key = getattr(row, field)
+        index[key] = _put(index.get(key, []), row.id, row)
+
+class TableCache:
+    """One loaded table: rows in id order plus lookup indexes."""
+
+    __slots__ = ("rows", "by_id", "by_gender")
+
+    def __init__(self, row_type, rows):
+        self.rows = sorted(rows, key=lambda row: row.id)
+        self.by_id = {row.id: row for row in self.rows}
+        self.by_gender = None
+        if "gender" in row_type._fields:
+            self.by_gender = {}
+            for row in self.rows:
+                self.by_gender.setdefault(row.gender, []).append(row)
+
+    def put(self, row_id, row):
+        """Swap in the current version of one row; None removes it."""
+        old = self.by_id.get(row_id)
+        if row is None:
+            self.by_id.pop(row_id, None)
+        else:
+            self.by_id[row_id] = row
+        self.rows = _put(self.rows, row_id, row)
+        if self.by_gender is not None:
+            _reindex(self.by_gender, "gender", old, row)
+
+# Guards _caches and the contents of every TableCache: writes patch them on
+# the writer thread while the Tk thread and the readers look rows up.
+_lock = threading.Lock()
+_caches = {}
+_versions = dict.fromkeys(TABLES, 0)
+_version_counter = itertools.count(1)
+_data_version = None
+
+def _load(table):
+    row_type, loader, _ = TABLES[table]
+    return TableCache(row_type, map(row_type._make, getattr(database, loader)()))
+
+def _bump(table):
+    _versions[table] = next(_version_counter)
+
+def _table(table):
+    cache = _caches.get(table)
+    if cache is None:
+        with _lock:
+            cache = _caches.get(table)
+            if cache is None:
+                cache = _caches[table] = _load(table)
+    return cache
+
+def _patch(table, ids):
+    """Read the given rows back from SQLite and swap them into the table's cache."""
+    row_type, _, getter = TABLES[table]
+    fresh = {}
+    if table in _caches:
+        for row_id in ids:
+            row = getattr(database, getter)(row_id)
+            fresh[row_id] = row_type._make(row) if row else None
+    with _lock:
+        cache = _caches.get(table)
+        if cache is not None:
+            for row_id, row in fresh.items():
+                cache.put(row_id, row)
+        _bump(table)
+
+def reload(*tables):
+    """Re-read whole tables (all of them when none are given) and swap them in.
+
+    Tables that have not been loaded yet are left to load on first use.
+    Slow on a large catalogue: run it off the Tk thread.
+    """
+    for table in tables or TABLES:
+        if table not in _caches:
+            continue
+        cache = _load(table)
+        with _lock:
+            _caches[table] = cache
+            _bump(table)
+
+def poll_external_changes():
+    """Reload every cached table if another process has committed since the last call.
+
+    Run it on the thread that makes all of this process's writes (the
+    TaskRunner writer): PRAGMA data_version on that thread's connection does
+    not move for its own commits, so only outside writes show up. The first
+    call just takes the baseline. Returns whether the caches were reloaded.
+    """
+    global _data_version
+    version = database.data_version()
+    changed = _data_version is not None and version != _data_version
+    _data_version = version
+    if changed:
+        reload()
+    return changed
+
+def version(*tables):
+    """Change token for the cached tables, like database.table_version()."""
+    return tuple(_versions[t] for t in tables)
+
+# ---------------- READS ----------------
+def fragrance(fid):
+    return _table("fragrances").by_id.get(fid)
+
+def fragrances(gender=None):
+    """All fragrances in id order, or those of one gender."""
+    cache = _table("fragrances")
+    return cache.rows if gender is None else cache.by_gender.get(gender, [])
+
+def supply(sid):
+    return _table("supplies").by_id.get(sid)
+
+def supplies():
+    return _table("supplies").rows
+
+def oil(oid):
+    return _table("oils").by_id.get(oid)
+
+def oils():
+    return _table("oils").rows
+
+def sales_after(after, limit, **filters):
+    """database.get_sales_after() as Sale tuples."""
+    return list(map(Sale._make, database.get_sales_after(after, limit, **filters)))
+
+# ---------------- WRITES ----------------
+# Writes go straight to SQLite; the rows they changed are then read back by
+# id and patched into the cache.
+def _write_through(name, table, ids):
+    def write(*args, **kwargs):
+        result = getattr(database, name)(*args, **kwargs)
+        _patch(table, ids(args, result))
+        return result
+    write.__name__ = write.__qualname__ = name
+    write.__doc__ = f"database.{name}(), then patch the {table} it changed into the cache."
+    return write
+
+_new_row = lambda args, result: (result,)
+_first_arg = lambda args, result: (args[0],)
+
+insert_fragrance = _write_through("insert_fragrance", "fragrances", _new_row)
+update_fragrance = _write_through("update_fragrance", "fragrances", _first_arg)
+update_fragrance_quantity = _write_through("update_fragrance_quantity", "fragrances", _first_arg)
+delete_fragrance = _write_through("delete_fragrance", "fragrances", _first_arg)
+set_imported_image = _write_through("set_imported_image", "fragrances", _first_arg)
+record_sale = _write_through("record_sale", "fragrances", _first_arg)
+insert_supply = _write_through("insert_supply", "supplies", _new_row)
+update_supply = _write_through("update_supply", "supplies", _first_arg)
+delete_supply = _write_through("delete_supply", "supplies", _first_arg)
+insert_oil = _write_through("insert_oil", "oils", _new_row)
+update_oil = _write_through("update_oil", "oils", _first_arg)
+delete_oil = _write_through("delete_oil", "oils", _first_arg)
+
+def record_basket_sale(customer_id, lines, date):
+    """database.record_basket_sale(), then patch the fragrances it sold into the cache."""
+    lines = list(lines)
+    result = database.record_basket_sale(customer_id, lines, date)
+    _patch("fragrances", {fid for fid, _ in lines})
+    return result
+
+# Bulk writes can touch any number of rows; the table is reloaded instead.
+# (CSV / JSON Lines imports go through bulkio.import_table(); the app calls
+# reload() after them.)
+def insert_missing(table, rows):
+    try:
+        return database.insert_missing(table, rows)
+    finally:
+        reload(table)
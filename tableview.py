@@ -0,0 +1,346 @@
+import tkinter as tk
+from tkinter import ttk
+
+DEFAULT_ROW_HEIGHT = 20
+HEADER_HEIGHT = 25
+OVERSCAN_PAGES = 1
+KEYSET_PAGE_SIZE = 200
+KEYSET_CACHED_PAGES = 4
+
+# ---------------- KEYSET PAGER ----------------
+class KeysetPager:
+    """Infinite-scroll source for VirtualTable over a keyset-paginated query.
+
+    page(after, limit) returns up to limit rows following the row whose
+    key(row) is after (None for the first page). Pages are pulled only when
+    the window reaches the end of what has been read, and count() reports
+    one page more than that until the query runs dry, so the scrollbar
+    grows as the user scrolls instead of the whole table being counted up
+    front.
+
+    Only the last KEYSET_CACHED_PAGES pages used are kept, plus the key
+    each page starts after, so memory does not grow with scroll depth:
+    scrolling back re-reads a page by seeking to its key, and refresh()
+    re-reads from the page at the current position rather than the top.
+    """
+
+    def __init__(self, page, key, page_size=KEYSET_PAGE_SIZE):
+        self.page = page
+        self.key = key
+        self.page_size = page_size
+        self.reset()
+
+    def reset(self):
+        self.marks = [None]     # marks[n]: key page n starts after
+        self.pages = {}         # page number -> rows, least recently used first
+        self.exhausted = False
+        self.tail = 0           # rows on the last page, once exhausted
+
+    def refresh(self, offset=0):
+        """Drop the rows read so far; pages up to offset keep their seek keys.
+
+        Pages past offset are re-read in order from there, so rows added or
+        removed since are picked up without re-reading from the top.
+        """
+        first = min(offset // self.page_size, len(self.marks) - 1)
+        del self.marks[first + 1:]
+        self.pages = {}
+        self.exhausted = False
+        self.tail = 0
+
+    def _load(self, number):
+        rows = self.pages.pop(number, None)
+        if rows is None:
+            rows = self.page(self.marks[number], self.page_size)
+        self.pages[number] = rows
+        while len(self.pages) > KEYSET_CACHED_PAGES:
+            del self.pages[next(iter(self.pages))]
+        if number == len(self.marks) - 1:
+            if len(rows) < self.page_size:
+                self.exhausted, self.tail = True, len(rows)
+            else:
+                self.marks.append(self.key(rows[-1]))
+        return rows
+
+    def fetch(self, offset, limit):
+        first = offset // self.page_size
+        last = (offset + limit - 1) // self.page_size
+        rows = []
+        # a page past the last known key is only reached by reading on from it
+        for number in range(min(first, len(self.marks) - 1), last + 1):
+            if number >= len(self.marks):
+                break
+            page = self._load(number)
+            if number >= first:
+                rows.extend(page)
+        start = offset - first * self.page_size
+        return rows[start:start + limit]
+
+    def count(self):
+        if not self.pages and not self.exhausted and len(self.marks) == 1:
+            self._load(0)
+        read = (len(self.marks) - 1) * self.page_size
+        return read + (self.tail if self.exhausted else self.page_size)
+
+
+# ---------------- VIRTUAL TABLE ----------------
+class VirtualTable:
+    """Windowed view over a ttk.Treeview.
+
+    Only the rows that fit in the viewport are inserted into the tree. The
+    scrollbar is driven from the total row count reported by the source, and
+    rows are paged in through fetch(offset, limit) as the user scrolls, with
+    one page of overscan kept in memory on each side of the window.
+
+    format_row(row) must return (iid, values, tags) for a source row.
+
+    Rendering is incremental: a hash of every materialized row is kept per
+    iid, so a redraw only inserts, updates, moves or deletes the rows that
+    actually differ. If version() is given, refresh() is skipped entirely
+    while the token it returns is unchanged.
+
+    Row images are optional and lazy: row_image(row) names the image for a
+    row (or None) and load_image(iid, key) returns its photo if it is ready.
+    Otherwise the loader calls set_row_image() when it is, so only rows in
+    the window ever load an image.
+    """
+
+    def __init__(self, tree, scrollbar, format_row, fetch=None, count=None, version=None,
+                 row_image=None, load_image=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.format_row = format_row
+        self.fetch = fetch
+        self.count = count
+        self.version = version
+        self.row_image = row_image
+        self.load_image = load_image
+        self.pager = None
+        self.rendered_version = None
+        self.source_key = None
+        self.offset = 0
+        self.total = 0
+        self.page_size = int(tree.cget("height") or 10)
+        self.selected_iid = None
+        self._block_start = 0
+        self._block = []
+        self._row_hashes = {}
+        self._row_images = {}   # iid -> (image key, photo) for materialized rows
+
+        scrollbar.configure(command=self.yview)
+        tree.configure(yscrollcommand="")
+        tree.bind("<Configure>", self._on_resize, add="+")
+        tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        tree.bind("<MouseWheel>", self._on_wheel)
+        tree.bind("<Button-4>", lambda e: self._scroll(-3))
+        tree.bind("<Button-5>", lambda e: self._scroll(3))
+        tree.bind("<Up>", self._on_up)
+        tree.bind("<Down>", self._on_down)
+        tree.bind("<Prior>", lambda e: self._scroll(-self.page_size))
+        tree.bind("<Next>", lambda e: self._scroll(self.page_size))
+
+    # ---------------- SOURCE ----------------
+    def set_source(self, fetch, count, key=None):
+        """Swap the row source and redraw.
+
+        When key matches the previous source's key this is a plain refresh
+        that keeps the scroll position; any other source starts from the top.
+        """
+        same_source = key is not None and key == self.source_key
+        if not same_source:
+            self.offset = 0
+        self.source_key = key
+        self.fetch = fetch
+        self.count = count
+        self.pager = None
+        self.refresh(force=not same_source)
+
+    def set_pager(self, pager, key=None):
+        """Like set_source() for a KeysetPager; the total grows as it loads."""
+        same_source = key is not None and key == self.source_key
+        if not same_source:
+            self.offset = 0
+        self.source_key = key
+        self.fetch = pager.fetch
+        self.count = pager.count
+        self.pager = pager
+        self.refresh(force=not same_source)
+
+    def set_rows(self, rows):
+        """Show an in-memory list of rows (e.g. search results)."""
+        rows = list(rows)
+        self.set_source(lambda offset, limit: rows[offset:offset + limit], lambda: len(rows))
+
+    def refresh(self, force=False):
+        """Re-read the row count and the current window from the source."""
+        version = self.version() if self.version else None
+        if not force and version is not None and version == self.rendered_version:
+            return
+        self.rendered_version = version
+        self._block = []
+        if self.pager:
+            # Re-seek from the window's first page so the position survives
+            # the refresh without re-reading everything above it
+            self.pager.refresh(max(0, self.offset - self.page_size * OVERSCAN_PAGES))
+            self.pager.fetch(self.offset, self.page_size)
+        self.total = self.count() if self.count else 0
+        self.offset = max(0, min(self.offset, self.total - self.page_size))
+        self._render()
+
+    def selection(self):
+        return (self.selected_iid,) if self.selected_iid is not None else ()
+
+    def rows_around(self, iid, radius):
+        """Source rows within radius of iid that are already paged in."""
+        iids = [self.format_row(row)[0] for row in self._block]
+        if iid not in iids:
+            return []
+        index = iids.index(iid)
+        return [row for row in self._block[max(0, index - radius):index + radius + 1]
+                if row is not self._block[index]]
+
+    def set_row_image(self, iid, key, photo):
+        """Show photo on row iid if it is still materialized and still wants key."""
+        current = self._row_images.get(iid)
+        if current is None or current[0] != key or not self.tree.exists(iid):
+            return
+        self._row_images[iid] = (key, photo)
+        self.tree.item(iid, image=photo or "")
+
+    def clear_selection(self):
+        self.selected_iid = None
+        self.tree.selection_set(())
+
+    # ---------------- WINDOW ----------------
+    def _window_rows(self):
+        start, end = self.offset, min(self.offset + self.page_size, self.total)
+        block_end = self._block_start + len(self._block)
+        if start < self._block_start or (end > block_end and block_end < self.total):
+            self._block_start = max(0, start - self.page_size * OVERSCAN_PAGES)
+            limit = self.page_size * (1 + 2 * OVERSCAN_PAGES)
+            self._block = list(self.fetch(self._block_start, limit)) if self.fetch else []
+            if self.pager:
+                self.total = self.pager.count()
+                end = min(self.offset + self.page_size, self.total)
+        lo = start - self._block_start
+        return self._block[lo:lo + (end - start)]
+
+    def _render(self):
+        tree = self.tree
+        source_rows = self._window_rows()
+        rows = [self.format_row(row) for row in source_rows]
+        wanted = {iid for iid, _, _ in rows}
+        stale = [iid for iid in tree.get_children() if iid not in wanted]
+        if stale:
+            tree.delete(*stale)
+            for iid in stale:
+                del self._row_hashes[iid]
+                self._row_images.pop(iid, None)
+        for index, (row, (iid, values, tags)) in enumerate(zip(source_rows, rows)):
+            image_key = self.row_image(row) if self.row_image else None
+            row_hash = hash((tuple(values), tuple(tags), image_key))
+            old_hash = self._row_hashes.get(iid)
+            if old_hash is None:
+                tree.insert("", index, iid=iid, values=values, tags=tags)
+            elif old_hash != row_hash:
+                tree.item(iid, values=values, tags=tags)
+            if old_hash != row_hash and self.load_image:
+                self._row_images[iid] = (image_key, None)
+                photo = self.load_image(iid, image_key) if image_key else None
+                self.set_row_image(iid, image_key, photo)
+            self._row_hashes[iid] = row_hash
+        order = [iid for iid, _, _ in rows]
+        if list(tree.get_children()) != order:
+            for index, iid in enumerate(order):
+                tree.move(iid, "", index)
+        if self.selected_iid is not None and tree.exists(self.selected_iid):
+            if tree.selection() != (self.selected_iid,):
+                tree.selection_set(self.selected_iid)
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        if self.total <= 0:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        first = self.offset / self.total
+        last = min(1.0, (self.offset + self.page_size) / self.total)
+        self.scrollbar.set(first, last)
+
+    def _scroll_to(self, offset):
+        offset = max(0, min(int(offset), self.total - self.page_size))
+        if offset != self.offset:
+            self.offset = offset
+            self._render()
+
+    def _scroll(self, rows):
+        self._scroll_to(self.offset + rows)
+        return "break"
+
+    # ---------------- EVENTS ----------------
+    def yview(self, *args):
+        if not args:
+            return
+        if args[0] == "moveto":
+            self._scroll_to(float(args[1]) * self.total)
+        elif args[0] == "scroll":
+            step = int(args[1])
+            self._scroll(step * self.page_size if args[2] == "pages" else step)
+
+    def _on_wheel(self, event):
+        step = -1 if event.delta > 0 else 1
+        if abs(event.delta) >= 120:
+            step *= abs(event.delta) // 120
+        return self._scroll(step * 3)
+
+    def _on_resize(self, event):
+        row_height = self._row_height()
+        page_size = max(1, (event.height - self._header_height()) // row_height)
+        if page_size != self.page_size:
+            self.page_size = page_size
+            self.offset = max(0, min(self.offset, self.total - self.page_size))
+            self._render()
+
+    def _on_select(self, event):
+        selected = self.tree.selection()
+        if selected:
+            self.selected_iid = selected[0]
+        elif self.selected_iid is not None and self.tree.exists(self.selected_iid):
+            # Deselected by the user; a row that merely scrolled out of the
+            # window keeps its selection and is reselected when it returns.
+            self.selected_iid = None
+
+    def _on_up(self, event):
+        children = self.tree.get_children()
+        if children and self.tree.focus() == children[0] and self.offset > 0:
+            self._scroll(-1)
+            self._select_edge(0)
+            return "break"
+
+    def _on_down(self, event):
+        children = self.tree.get_children()
+        if children and self.tree.focus() == children[-1] and self.offset + self.page_size < self.total:
+            self._scroll(1)
+            self._select_edge(-1)
+            return "break"
+
+    def _select_edge(self, index):
+        children = self.tree.get_children()
+        if children:
+            iid = children[index]
+            self.tree.focus(iid)
+            self.tree.selection_set(iid)
+
+    def _row_height(self):
+        style = self.tree.cget("style") or "Treeview"
+        try:
+            return int(ttk.Style().lookup(style, "rowheight") or DEFAULT_ROW_HEIGHT)
+        except (ValueError, tk.TclError):
+            return DEFAULT_ROW_HEIGHT
+
+    def _header_height(self):
+        children = self.tree.get_children()
+        if children:
+            bbox = self.tree.bbox(children[0])
+            if bbox:
+                return bbox[1]
+        return HEADER_HEIGHT
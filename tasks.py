@@ -0,0 +1,103 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+READ_WORKERS = 2
+RESULT_POLL_MS = 20
+
+# ---------------- TASK RUNNER ----------------
+class TaskRunner:
+    """Runs database work off the Tk thread.
+
+    write() jobs go to a single writer thread and run one at a time in the
+    order they were submitted, so each write sees the ones before it and
+    SQLite never has two writers from this process queueing on its lock.
+    read() jobs share a small pool. Every worker thread uses its own pooled
+    connection (see database.get_conn()).
+
+    on_done(result) and on_error(exc) are called on the Tk thread through
+    root.after() polling; on_busy(pending) is called there whenever the
+    number of unfinished jobs changes, to drive a busy indicator.
+    """
+
+    def __init__(self, root, on_error=None, on_busy=None, readers=READ_WORKERS):
+        self.root = root
+        self.on_error = on_error
+        self.on_busy = on_busy
+        self.pending = 0
+        self._quiet = 0         # unfinished background() jobs
+        self._done = queue.Queue()
+        self._poll_id = None
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="db-reader")
+
+    def write(self, fn, *args, on_done=None, on_error=None, **kwargs):
+        """Queue fn(*args, **kwargs) behind every earlier write; returns its Future."""
+        return self._submit(self._writer, fn, args, kwargs, on_done, on_error)
+
+    def read(self, fn, *args, on_done=None, on_error=None, **kwargs):
+        """Run fn(*args, **kwargs) on the reader pool; returns its Future."""
+        return self._submit(self._readers, fn, args, kwargs, on_done, on_error)
+
+    def background(self, fn, *args, on_done=None, on_error=None, **kwargs):
+        """Like write(), for periodic housekeeping: not counted by on_busy."""
+        return self._submit(self._writer, fn, args, kwargs, on_done, on_error, busy=False)
+
+    def post(self, fn, *args):
+        """Call fn(*args) on the Tk thread, from inside a running job.
+
+        Meant for progress updates; the queue is only polled while a job
+        is pending.
+        """
+        self._done.put((None, fn, args, None))
+
+    def close(self):
+        """Let queued writes finish; drop reads that have not started."""
+        self._readers.shutdown(wait=False, cancel_futures=True)
+        self._writer.shutdown(wait=True)
+
+    def _submit(self, executor, fn, args, kwargs, on_done, on_error, busy=True):
+        future = executor.submit(fn, *args, **kwargs)
+        if busy:
+            self.pending += 1
+            if self.on_busy:
+                self.on_busy(self.pending)
+        else:
+            self._quiet += 1
+        future.add_done_callback(lambda f: self._done.put((f, on_done, on_error, busy)))
+        if self._poll_id is None:
+            self._poll_id = self.root.after(RESULT_POLL_MS, self._poll)
+        return future
+
+    def _poll(self):
+        self._poll_id = None
+        before = self.pending
+        try:
+            while True:
+                try:
+                    future, on_done, on_error, busy = self._done.get_nowait()
+                except queue.Empty:
+                    break
+                if future is None:
+                    # posted call: (None, fn, args, None)
+                    on_done(*on_error)
+                    continue
+                if busy:
+                    self.pending -= 1
+                else:
+                    self._quiet -= 1
+                try:
+                    result = future.result()
+                except Exception as e:
+                    handler = on_error or self.on_error
+                    if handler:
+                        handler(e)
+                    else:
+                        print(f"Background task failed: {e}")
+                    continue
+                if on_done:
+                    on_done(result)
+        finally:
+            if self.on_busy and self.pending != before:
+                self.on_busy(self.pending)
+            if self.pending or self._quiet:
+                self._poll_id = self.root.after(RESULT_POLL_MS, self._poll)
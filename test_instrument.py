@@ -0,0 +1,45 @@
+"""Instrumentation checks, run against the headless app from bench.py."""
+import pytest
+
+import database
+import instrument
+import repository
+from tasks import TaskRunner
+
+main = pytest.importorskip("main", exc_type=ImportError)
+from bench import headless_app
+
+
+@pytest.fixture
+def app(tmp_path):
+    database.set_db_path(str(tmp_path / "instrument.db"))
+    database.init_db()
+    repository.reload()
+    app = headless_app()
+    app.tasks = TaskRunner(app.root)
+    instrument.reset()
+    instrument.enable(main.FragranceManagerApp)
+    try:
+        yield app
+    finally:
+        instrument.disable()
+        instrument.reset()
+        app.tasks.close()
+        database.shutdown()
+
+def run_jobs(app):
+    """Wait for the jobs queued so far and deliver their callbacks."""
+    app.tasks._writer.submit(lambda: None).result()
+    app.tasks._poll()
+
+def test_timer_ticks_record_no_action(app):
+    for _ in range(3):
+        app.poll_external_changes()
+        app.periodic_checkpoint()
+        run_jobs(app)
+    assert instrument.recent() == []
+
+def test_handlers_still_record_actions(app):
+    app.refresh_all_tables()
+    run_jobs(app)
+    assert [act.name for act in instrument.recent()] == ["refresh_all_tables"]
@@ -0,0 +1,52 @@
+"""Upgrade checks: init_db() against databases from before the migrations."""
+import sqlite3
+
+import pytest
+
+import database
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    """A pre-migration database full of values the cents schema's CHECKs reject."""
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    database._create_tables(conn.cursor())
+    conn.executemany("INSERT INTO fragrances (id, name, unit_cost, sale_price, quantity) VALUES (?, ?, ?, ?, ?)",
+                     [(1, "Good", 1.5, "3.25", 4), (2, "Bad", "abc", "", -3)])
+    conn.execute("INSERT INTO customers (id, name) VALUES (1, 'Customer')")
+    conn.executemany("""
+        INSERT INTO sales (id, fragrance_id, customer_id, qty_sold, unit_cost, sale_price, revenue, profit, date)
+        VALUES (?, 1, 1, ?, 1.5, 3.25, 6.5, 3.5, '2024-01-01')
+    """, [(1, 2), (2, 0), (3, None), (4, -1), (5, "abc")])
+    conn.commit()
+    conn.close()
+    database.set_db_path(path)
+    try:
+        yield path
+    finally:
+        database.shutdown()
+
+def query(sql):
+    with database.get_conn() as conn:
+        return conn.execute(sql).fetchall()
+
+def test_upgrade_repairs_or_sets_aside_bad_rows(legacy_db):
+    database.init_db()
+    assert database.schema_version() == len(database.MIGRATIONS)
+    assert query("SELECT id, qty_sold, revenue FROM sales") == [(1, 2, 650)]
+    assert query("SELECT id FROM sales_rejected ORDER BY id") == [(2,), (3,), (4,), (5,)]
+    assert query("SELECT id, unit_cost, sale_price, quantity FROM fragrances ORDER BY id") == \
+        [(1, 150, 325, 4), (2, 0, 0, 0)]
+    assert query("SELECT * FROM customer_stats") == [(1, 1, 650, 350, "2024-01-01")]
+
+def test_upgrade_reports_what_it_changed(legacy_db):
+    notes = database.init_db()
+    assert notes == [
+        "fragrances.unit_cost was not a number in 1 rows (ids 2); stored as 0.00",
+        "fragrances.sale_price was not a number in 1 rows (ids 2); stored as 0.00",
+        "Moved 4 sales with no positive quantity to sales_rejected",
+    ]
+    assert [message for message, in query("SELECT message FROM upgrade_log ORDER BY id")] == notes
+    # Nothing left to upgrade, nothing new to report
+    assert database.init_db() == []